@@ -0,0 +1,31 @@
+"""Add descending created_at index to user_bots table
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add index for recent bots listing (ORDER BY created_at DESC LIMIT n)"""
+
+    op.create_index(
+        'ix_userbot_created_at_desc',
+        'user_bots',
+        [sa.text('created_at DESC')]
+    )
+
+
+def downgrade() -> None:
+    """Remove recent bots listing index"""
+
+    op.drop_index('ix_userbot_created_at_desc', table_name='user_bots')
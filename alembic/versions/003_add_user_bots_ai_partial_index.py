@@ -0,0 +1,34 @@
+"""Add partial AI index to user_bots table
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-18 10:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add partial index for AI-enabled bots listing"""
+    
+    # Equality on ai_assistant_type, ordering by last_activity DESC;
+    # only AI-enabled bots are indexed
+    op.create_index(
+        'ix_userbot_ai_partial',
+        'user_bots',
+        ['ai_assistant_type', sa.text('last_activity DESC')],
+        postgresql_where=sa.text('ai_assistant_enabled = true')
+    )
+
+
+def downgrade() -> None:
+    """Remove partial AI index"""
+    
+    op.drop_index('ix_userbot_ai_partial', table_name='user_bots')
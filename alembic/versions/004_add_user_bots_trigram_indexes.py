@@ -0,0 +1,43 @@
+"""Add trigram search indexes to user_bots table
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-18 10:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add GIN trigram indexes for ILIKE '%query%' bot search"""
+    
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    
+    op.create_index(
+        'ix_userbot_name_trgm',
+        'user_bots',
+        ['bot_name'],
+        postgresql_using='gin',
+        postgresql_ops={'bot_name': 'gin_trgm_ops'}
+    )
+    op.create_index(
+        'ix_userbot_username_trgm',
+        'user_bots',
+        ['bot_username'],
+        postgresql_using='gin',
+        postgresql_ops={'bot_username': 'gin_trgm_ops'}
+    )
+
+
+def downgrade() -> None:
+    """Remove trigram search indexes (the pg_trgm extension is left installed)"""
+    
+    op.drop_index('ix_userbot_username_trgm', table_name='user_bots')
+    op.drop_index('ix_userbot_name_trgm', table_name='user_bots')
@@ -0,0 +1,32 @@
+"""Add partial last_activity index for inactive bots cleanup
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-18 10:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add partial index used by batched cleanup_inactive_bots"""
+    
+    op.create_index(
+        'ix_userbot_last_activity_not_inactive',
+        'user_bots',
+        ['last_activity'],
+        postgresql_where=sa.text("status <> 'inactive'")
+    )
+
+
+def downgrade() -> None:
+    """Remove cleanup index"""
+    
+    op.drop_index('ix_userbot_last_activity_not_inactive', table_name='user_bots')
@@ -0,0 +1,31 @@
+"""Add (user_id, last_activity DESC) index to user_bots table
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add index for owner-scoped bot search ordered by activity"""
+    
+    op.create_index(
+        'ix_userbot_user_last',
+        'user_bots',
+        ['user_id', sa.text('last_activity DESC')]
+    )
+
+
+def downgrade() -> None:
+    """Remove owner-scoped search index"""
+    
+    op.drop_index('ix_userbot_user_last', table_name='user_bots')
@@ -0,0 +1,34 @@
+"""Add status and AI type indexes for bots summary grouping
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-18 11:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add narrow indexes so summary group-bys can run as index-only scans"""
+    
+    op.create_index('ix_userbot_status', 'user_bots', ['status'])
+    op.create_index(
+        'ix_userbot_ai_type_enabled',
+        'user_bots',
+        ['ai_assistant_type'],
+        postgresql_where=sa.text('ai_assistant_enabled = true')
+    )
+
+
+def downgrade() -> None:
+    """Remove summary grouping indexes"""
+    
+    op.drop_index('ix_userbot_ai_type_enabled', table_name='user_bots')
+    op.drop_index('ix_userbot_status', table_name='user_bots')
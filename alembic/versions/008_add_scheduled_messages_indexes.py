@@ -0,0 +1,51 @@
+"""Add scheduled_messages sender indexes and active broadcast messages index
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-18 11:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add indexes for the pending sender query, per-bot stats and scheduling"""
+    
+    # scheduled_messages is written constantly by the sender, don't block it
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_sched_pending_at',
+            'scheduled_messages',
+            ['scheduled_at'],
+            postgresql_where=sa.text("status = 'pending'"),
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_sched_bot_status',
+            'scheduled_messages',
+            ['bot_id', 'status'],
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_bm_seq_active',
+            'broadcast_messages',
+            ['sequence_id'],
+            postgresql_where=sa.text('is_active = true'),
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    """Remove scheduled_messages and broadcast_messages indexes"""
+    
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_bm_seq_active', table_name='broadcast_messages', postgresql_concurrently=True)
+        op.drop_index('ix_sched_bot_status', table_name='scheduled_messages', postgresql_concurrently=True)
+        op.drop_index('ix_sched_pending_at', table_name='scheduled_messages', postgresql_concurrently=True)
@@ -0,0 +1,34 @@
+"""Add broadcast_stats_daily rollup table
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-18 11:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add daily scheduled_messages rollup read by get_broadcast_summary"""
+    
+    op.create_table(
+        'broadcast_stats_daily',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('status', sa.String(length=50), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint('day', 'status')
+    )
+
+
+def downgrade() -> None:
+    """Remove daily rollup table"""
+    
+    op.drop_table('broadcast_stats_daily')
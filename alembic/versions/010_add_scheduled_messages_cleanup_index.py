@@ -0,0 +1,43 @@
+"""Add updated_at and cleanup index to scheduled_messages table
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add updated_at (used by cancel/cleanup) and partial index for cleanup_old_scheduled_messages"""
+    
+    # Existing rows get the migration time and age out of cleanup from there
+    op.add_column(
+        'scheduled_messages',
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now())
+    )
+    
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_scheduled_messages_cleanup',
+            'scheduled_messages',
+            ['updated_at'],
+            postgresql_where=sa.text("status IN ('sent', 'failed', 'cancelled')"),
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    """Remove cleanup index and updated_at column"""
+    
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_scheduled_messages_cleanup', table_name='scheduled_messages', postgresql_concurrently=True)
+    
+    op.drop_column('scheduled_messages', 'updated_at')
@@ -0,0 +1,33 @@
+"""Add BRIN index on scheduled_messages.created_at
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-18 12:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add BRIN index for recent created_at range scans (daily stats rollup)"""
+    
+    op.create_index(
+        'ix_scheduled_messages_created_at_brin',
+        'scheduled_messages',
+        ['created_at'],
+        postgresql_using='brin',
+        postgresql_with={'pages_per_range': 32}
+    )
+
+
+def downgrade() -> None:
+    """Remove created_at BRIN index"""
+    
+    op.drop_index('ix_scheduled_messages_created_at_brin', table_name='scheduled_messages')
@@ -0,0 +1,48 @@
+"""Replace scheduled_messages cleanup index with covering (status, updated_at) index
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-18 12:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '012'
+down_revision = '011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add covering cleanup index and drop the updated_at-only one it supersedes"""
+    
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_sm_cleanup_cov',
+            'scheduled_messages',
+            ['status', 'updated_at'],
+            postgresql_include=['id'],
+            postgresql_where=sa.text("status IN ('sent', 'failed', 'cancelled')"),
+            postgresql_concurrently=True
+        )
+        op.drop_index(
+            'ix_scheduled_messages_cleanup',
+            table_name='scheduled_messages',
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    """Restore the updated_at-only cleanup index"""
+    
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_scheduled_messages_cleanup',
+            'scheduled_messages',
+            ['updated_at'],
+            postgresql_where=sa.text("status IN ('sent', 'failed', 'cancelled')"),
+            postgresql_concurrently=True
+        )
+        op.drop_index('ix_sm_cleanup_cov', table_name='scheduled_messages', postgresql_concurrently=True)
@@ -0,0 +1,83 @@
+"""Convert scheduled_messages.status to a native enum
+
+Revision ID: 013
+Revises: 012
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '013'
+down_revision = '012'
+branch_labels = None
+depends_on = None
+
+scheduled_message_status = postgresql.ENUM(
+    'pending', 'sent', 'failed', 'cancelled',
+    name='scheduled_message_status'
+)
+
+
+def _drop_status_indexes() -> None:
+    """Drop indexes whose columns or predicates reference status"""
+    
+    op.drop_index('ix_sm_cleanup_cov', table_name='scheduled_messages')
+    op.drop_index('ix_sched_bot_status', table_name='scheduled_messages')
+    op.drop_index('ix_sched_pending_at', table_name='scheduled_messages')
+
+
+def _create_status_indexes() -> None:
+    """Recreate status indexes so predicates compare against the new column type"""
+    
+    op.create_index(
+        'ix_sched_pending_at',
+        'scheduled_messages',
+        ['scheduled_at'],
+        postgresql_where=sa.text("status = 'pending'")
+    )
+    op.create_index('ix_sched_bot_status', 'scheduled_messages', ['bot_id', 'status'])
+    op.create_index(
+        'ix_sm_cleanup_cov',
+        'scheduled_messages',
+        ['status', 'updated_at'],
+        postgresql_include=['id'],
+        postgresql_where=sa.text("status IN ('sent', 'failed', 'cancelled')")
+    )
+
+
+def upgrade() -> None:
+    """Store status as a 4-byte enum instead of VARCHAR(50)"""
+    
+    scheduled_message_status.create(op.get_bind(), checkfirst=True)
+    
+    # Partial index predicates were written against varchar; rebuild them after the type change
+    _drop_status_indexes()
+    op.alter_column(
+        'scheduled_messages',
+        'status',
+        type_=scheduled_message_status,
+        existing_type=sa.String(length=50),
+        existing_nullable=False,
+        postgresql_using='status::scheduled_message_status'
+    )
+    _create_status_indexes()
+
+
+def downgrade() -> None:
+    """Restore VARCHAR status"""
+    
+    _drop_status_indexes()
+    op.alter_column(
+        'scheduled_messages',
+        'status',
+        type_=sa.String(length=50),
+        existing_type=scheduled_message_status,
+        existing_nullable=False,
+        postgresql_using='status::text'
+    )
+    _create_status_indexes()
+    
+    scheduled_message_status.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,32 @@
+"""Add partial openai_agent_id index to user_bots table
+
+Revision ID: 014
+Revises: 013
+Create Date: 2026-10-18 13:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '014'
+down_revision = '013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add index for lookups of a bot by its OpenAI agent id"""
+    
+    op.create_index(
+        'ix_userbot_openai_agent_id',
+        'user_bots',
+        ['openai_agent_id'],
+        postgresql_where=sa.text('openai_agent_id IS NOT NULL')
+    )
+
+
+def downgrade() -> None:
+    """Remove OpenAI agent lookup index"""
+    
+    op.drop_index('ix_userbot_openai_agent_id', table_name='user_bots')
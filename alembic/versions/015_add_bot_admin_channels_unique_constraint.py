@@ -0,0 +1,50 @@
+"""Add unique index on active bot_admin_channels rows per bot
+
+Revision ID: 015
+Revises: 014
+Create Date: 2026-10-18 13:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '015'
+down_revision = '014'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Allow one active channel per bot with a partial unique index used by upserts"""
+    
+    # UNIQUE (bot_id, is_active) from ContentManager's runtime DDL also allowed
+    # only one inactive row per bot, so deactivating a second channel failed
+    op.execute("ALTER TABLE bot_admin_channels DROP CONSTRAINT IF EXISTS unique_bot_channel")
+    
+    # Tables created from the models may hold several active rows per bot;
+    # keep the newest active and move the rest to history instead of deleting
+    op.execute("""
+        UPDATE bot_admin_channels a
+        SET is_active = false
+        FROM bot_admin_channels b
+        WHERE a.bot_id = b.bot_id
+          AND a.is_active = true
+          AND b.is_active = true
+          AND a.id < b.id
+    """)
+    
+    op.create_index(
+        'uq_bot_channel_active',
+        'bot_admin_channels',
+        ['bot_id'],
+        unique=True,
+        postgresql_where=sa.text('is_active = true'),
+        if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    """Remove the partial unique index (deactivated duplicates stay inactive)"""
+    
+    op.drop_index('uq_bot_channel_active', table_name='bot_admin_channels', if_exists=True)
@@ -0,0 +1,44 @@
+"""Add partial active-row indexes to bot_admin_channels and content_agents tables
+
+Revision ID: 016
+Revises: 015
+Create Date: 2026-10-18 13:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '016'
+down_revision = '015'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add indexes for per-bot lookups of the active channel and content agent"""
+    
+    # ContentManager's runtime DDL may have created them already
+    op.create_index(
+        'idx_channels_bot_active',
+        'bot_admin_channels',
+        ['bot_id'],
+        postgresql_include=['chat_id'],
+        postgresql_where=sa.text('is_active = true'),
+        if_not_exists=True
+    )
+    
+    op.create_index(
+        'idx_content_agents_bot_active',
+        'content_agents',
+        ['bot_id'],
+        postgresql_where=sa.text('is_active = true'),
+        if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    """Remove active-row lookup indexes"""
+    
+    op.drop_index('idx_content_agents_bot_active', table_name='content_agents', if_exists=True)
+    op.drop_index('idx_channels_bot_active', table_name='bot_admin_channels', if_exists=True)
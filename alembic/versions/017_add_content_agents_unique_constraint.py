@@ -0,0 +1,50 @@
+"""Add unique index on active content_agents rows per bot
+
+Revision ID: 017
+Revises: 016
+Create Date: 2026-10-18 13:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '017'
+down_revision = '016'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Allow one active agent per bot with a partial unique index used by upserts"""
+    
+    # UNIQUE (bot_id, is_active) from ContentManager's runtime DDL also allowed
+    # only one inactive row per bot, so a second soft delete failed
+    op.execute("ALTER TABLE content_agents DROP CONSTRAINT IF EXISTS unique_bot_content_agent")
+    
+    # Tables created from the models may hold several active rows per bot;
+    # keep the newest active and soft-delete the rest instead of deleting
+    op.execute("""
+        UPDATE content_agents a
+        SET is_active = false, updated_at = NOW()
+        FROM content_agents b
+        WHERE a.bot_id = b.bot_id
+          AND a.is_active = true
+          AND b.is_active = true
+          AND a.id < b.id
+    """)
+    
+    op.create_index(
+        'uq_content_agent_active',
+        'content_agents',
+        ['bot_id'],
+        unique=True,
+        postgresql_where=sa.text('is_active = true'),
+        if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    """Remove the partial unique index (soft-deleted duplicates stay inactive)"""
+    
+    op.drop_index('uq_content_agent_active', table_name='content_agents', if_exists=True)
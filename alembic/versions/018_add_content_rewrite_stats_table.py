@@ -0,0 +1,55 @@
+"""Add content_rewrite_stats table previously created by ContentManager at runtime
+
+Revision ID: 018
+Revises: 017
+Create Date: 2026-10-18 13:50:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '018'
+down_revision = '017'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add rewrite stats table and its indexes (no-ops where runtime DDL made them)"""
+    
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS content_rewrite_stats (
+            id SERIAL PRIMARY KEY,
+            bot_id VARCHAR(255) NOT NULL,
+            user_id BIGINT,
+            tokens_used INTEGER NOT NULL DEFAULT 0,
+            input_tokens INTEGER DEFAULT 0,
+            output_tokens INTEGER DEFAULT 0,
+            processing_time FLOAT NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT NOW()
+        )
+    """)
+    
+    # stats are appended continuously by the rewrite flusher, don't block it
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_content_stats_bot_id',
+            'content_rewrite_stats',
+            ['bot_id'],
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+        op.create_index(
+            'idx_content_stats_created',
+            'content_rewrite_stats',
+            ['created_at'],
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    """Remove rewrite stats table"""
+    
+    op.execute("DROP TABLE IF EXISTS content_rewrite_stats")
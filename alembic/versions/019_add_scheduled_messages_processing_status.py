@@ -0,0 +1,45 @@
+"""Add 'processing' status for scheduled messages claimed by a sender
+
+Revision ID: 019
+Revises: 018
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '019'
+down_revision = '018'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Add claim status and the index used to expire stale claims"""
+    
+    # ADD VALUE can't run inside a transaction block on older PostgreSQL
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE scheduled_message_status ADD VALUE IF NOT EXISTS 'processing'")
+        op.create_index(
+            'ix_sched_processing_updated',
+            'scheduled_messages',
+            ['updated_at'],
+            postgresql_where=sa.text("status = 'processing'"),
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    """Return claimed messages to the queue and drop the claim index"""
+    
+    # PostgreSQL can't drop enum values; 'processing' stays in the type unused
+    op.execute("UPDATE scheduled_messages SET status = 'pending' WHERE status = 'processing'")
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_sched_processing_updated',
+            table_name='scheduled_messages',
+            postgresql_concurrently=True,
+            if_exists=True
+        )
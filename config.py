@@ -9,6 +9,16 @@ class Settings(BaseSettings):
     
     # Database Settings
     database_url: str = Field(..., env="DATABASE_URL")
+    db_pool_size: int = Field(default=20, env="DB_POOL_SIZE")  # persistent pooled connections
+    db_max_overflow: int = Field(default=40, env="DB_MAX_OVERFLOW")  # extra connections under burst
+    db_pool_recycle: int = Field(default=1800, env="DB_POOL_RECYCLE")  # seconds before a connection is replaced
+    db_pool_pre_ping: bool = Field(default=True, env="DB_POOL_PRE_PING")  # check connections on checkout
+    db_query_cache_size: int = Field(default=1200, env="DB_QUERY_CACHE_SIZE")  # compiled SQL statements kept per engine
+    db_prepared_statement_cache_size: int = Field(default=500, env="DB_PREPARED_STATEMENT_CACHE_SIZE")  # asyncpg server-side prepared statements per connection
+    db_jit: bool = Field(default=False, env="DB_JIT")  # PostgreSQL JIT compilation for this app's connections
+    db_pool_warmup: int = Field(default=5, env="DB_POOL_WARMUP")  # connections opened at startup so first requests skip connect/auth
+    cache_stats_ttl: int = Field(default=30, env="CACHE_STATS_TTL")  # seconds CacheManager.get_cache_statistics is reused
+    cache_stale_report_ttl: int = Field(default=60, env="CACHE_STALE_REPORT_TTL")  # seconds CacheManager.get_stale_data_report is reused
     
     # ✅ FIXED: Robokassa Settings with correct environment variable names
     robokassa_merchant_login: str = Field(default="", env="ROBOKASSA_MERCHANT_LOGIN")
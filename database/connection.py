@@ -1,11 +1,11 @@
 import asyncio
 import json
 import random
+import orjson
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.pool import NullPool
-from sqlalchemy.sql import func, select
+from sqlalchemy.sql import func, select, text
 from sqlalchemy.dialects.postgresql import insert  # ✅ ДОБАВЛЕН импорт для UPSERT
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, AsyncExitStack
 from typing import AsyncGenerator, Optional, List, Union, Tuple, Dict
 from datetime import datetime, timedelta, date
 from decimal import Decimal
@@ -16,6 +16,12 @@ from database.models import Base
 
 logger = structlog.get_logger()
 
+
+def _json_dumps(value) -> str:
+    """JSON/JSONB bind serializer (orjson, str keys like stdlib json)"""
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
 # Global engine instance
 engine = None
 async_session_factory = None
@@ -26,10 +32,24 @@ async def init_database():
     global engine, async_session_factory
     
     try:
-        # Create async engine
+        # Create async engine with a shared connection pool
         engine = create_async_engine(
             settings.database_url.replace("postgresql://", "postgresql+asyncpg://"),
-            poolclass=NullPool,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_recycle=settings.db_pool_recycle,
+            pool_pre_ping=settings.db_pool_pre_ping,
+            pool_use_lifo=True,  # reuse the most recent connections, let idle overflow age out
+            query_cache_size=settings.db_query_cache_size,
+            # asyncpg JSON/JSONB codecs (e.g. bot_admin_channels.last_rerait) encode/decode via orjson
+            json_serializer=_json_dumps,
+            json_deserializer=orjson.loads,
+            connect_args={
+                # asyncpg prepares every statement server-side and reuses it per connection
+                "prepared_statement_cache_size": settings.db_prepared_statement_cache_size,
+                # short OLTP statements gain nothing from JIT but can pay its compile cost
+                "server_settings": {"jit": "on" if settings.db_jit else "off"}
+            },
             echo=settings.debug,
             future=True
         )
@@ -44,7 +64,11 @@ async def init_database():
         
         # Create tables
         async with engine.begin() as conn:
+            # pg_trgm is required by trigram search indexes on user_bots
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
             await conn.run_sync(Base.metadata.create_all)
+        
+        await _warm_up_pool(min(settings.db_pool_warmup, settings.db_pool_size))
             
         logger.info("Database initialized successfully")
         
@@ -53,6 +77,21 @@ async def init_database():
         raise
 
 
+async def _warm_up_pool(size: int):
+    """Open size pooled connections at once so early requests reuse them"""
+    if size <= 0:
+        return
+    
+    try:
+        async with AsyncExitStack() as stack:
+            await asyncio.gather(*(
+                stack.enter_async_context(engine.connect()) for _ in range(size)
+            ))
+        logger.info("Database pool warmed up", connections=size)
+    except Exception as e:
+        logger.warning("Database pool warm-up failed", error=str(e))
+
+
 async def close_database():
     """Close database connection"""
     global engine
@@ -63,13 +102,22 @@ async def close_database():
 
 
 @asynccontextmanager
-async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
-    """Get database session context manager"""
+async def get_db_session(readonly: bool = False) -> AsyncGenerator[AsyncSession, None]:
+    """Get database session context manager
+    
+    readonly=True runs the session's connection in AUTOCOMMIT and skips the
+    final commit, so single-SELECT reads pay no BEGIN/COMMIT round trips.
+    """
     if not async_session_factory:
         raise RuntimeError("Database not initialized. Call init_database() first.")
     
     async with async_session_factory() as session:
         try:
+            if readonly:
+                await session.connection(execution_options={"isolation_level": "AUTOCOMMIT"})
+                yield session
+                return
+            
             yield session
             await session.commit()
         except Exception:
@@ -2318,7 +2366,10 @@ class DatabaseManager:
             session.add(sequence)
             await session.commit()
             await session.refresh(sequence)
-            return sequence
+        
+        from database.managers.broadcast_manager import BroadcastManager
+        BroadcastManager.invalidate_sequence_cache(bot_id)
+        return sequence
     
     @staticmethod
     async def get_broadcast_sequence(bot_id: str):
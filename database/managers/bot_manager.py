@@ -11,14 +11,57 @@ Responsibilities:
 
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Any
-from sqlalchemy import select, update, delete, func
+from sqlalchemy import select, update, delete, func, cast, union, tuple_, lambda_stmt, bindparam, Integer
 from sqlalchemy.sql import text
 import structlog
 
+from database.models import UserBot
 from ..connection import get_db_session
+from ..ttl_cache import AsyncTTLCache
 
 logger = structlog.get_logger()
 
+# Display fields returned by bot listing/search methods as read-only
+# mappings, without ORM identity-map bookkeeping
+_BOT_LIST_COLUMNS = (
+    UserBot.id,
+    UserBot.bot_id,
+    UserBot.user_id,
+    UserBot.bot_name,
+    UserBot.bot_username,
+    UserBot.status,
+    UserBot.is_running,
+    UserBot.ai_assistant_type,
+    UserBot.created_at,
+    UserBot.last_activity,
+)
+
+
+def _limit_param():
+    """LIMIT bound as :limit but rendered as a literal at execute time"""
+    return bindparam("limit", literal_execute=True)
+
+
+# Admin dashboard summary, recomputed at most every 30 seconds per process
+_bots_summary_cache = AsyncTTLCache(ttl=30)
+
+# Recently created bots keyed by limit; dropped whenever a bot is created
+_recent_bots_cache = AsyncTTLCache(ttl=10)
+
+# One cleanup batch: lock up to :batch_size stale bots and mark them inactive.
+# asyncpg prepares it once per pooled connection and reuses the server-side plan.
+_CLEANUP_INACTIVE_BATCH = text("""
+    WITH batch AS (
+        SELECT id FROM user_bots
+        WHERE last_activity < :cutoff AND status <> 'inactive'
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE user_bots SET status = 'inactive'
+    FROM batch
+    WHERE user_bots.id = batch.id
+""")
+
 
 class BotManager:
     """Manager for bot-related database operations"""
@@ -48,6 +91,8 @@ class BotManager:
             session.add(bot)
             await session.commit()
             await session.refresh(bot)
+            _bots_summary_cache.invalidate()
+            _recent_bots_cache.invalidate()
             
             logger.info("✅ User bot created", 
                        bot_id=bot.bot_id,
@@ -319,6 +364,11 @@ class BotManager:
                 
                 # Коммитим транзакцию
                 await session.commit()
+                _bots_summary_cache.invalidate()
+                _recent_bots_cache.invalidate()
+                
+                from .broadcast_manager import BroadcastManager
+                BroadcastManager.invalidate_sequence_cache(bot_id)
                 
                 logger.info("✅ Bot and related data deleted successfully", 
                            bot_id=bot_id,
@@ -692,144 +742,150 @@ class BotManager:
     @staticmethod
     async def get_bots_by_status(status: str, limit: int = 100):
         """Get bots by status"""
-        from database.models import UserBot
+        # lambda_stmt caches the compiled SQL keyed on the lambdas' code,
+        # closure values (status) travel as bound parameters; the limit is
+        # rendered inline at execute time so the planner sees the constant
+        stmt = lambda_stmt(lambda: select(*_BOT_LIST_COLUMNS).where(UserBot.status == status))
+        stmt += lambda s: s.order_by(UserBot.last_activity.desc()).limit(_limit_param())
         
         async with get_db_session() as session:
-            result = await session.execute(
-                select(UserBot)
-                .where(UserBot.status == status)
-                .order_by(UserBot.last_activity.desc())
-                .limit(limit)
-            )
-            return result.scalars().all()
+            result = await session.execute(stmt, {"limit": limit})
+            return result.mappings().all()
     
     @staticmethod
     async def search_bots(query: str, user_id: Optional[int] = None, limit: int = 50):
-        """Search bots by name or username"""
-        from database.models import UserBot
+        """Search bots by name or username
         
-        async with get_db_session() as session:
-            conditions = [
-                UserBot.bot_name.ilike(f'%{query}%') |
-                UserBot.bot_username.ilike(f'%{query}%')
-            ]
-            
+        Name and username matches are fetched as separate UNION branches so
+        each one can use its own trigram index instead of an OR filter.
+        """
+        pattern = f'%{query}%'
+        
+        branches = []
+        for column in (UserBot.bot_name, UserBot.bot_username):
+            branch = select(*_BOT_LIST_COLUMNS).where(column.ilike(pattern))
             if user_id:
-                conditions.append(UserBot.user_id == user_id)
-            
-            result = await session.execute(
-                select(UserBot)
-                .where(*conditions)
-                .order_by(UserBot.last_activity.desc())
-                .limit(limit)
-            )
-            return result.scalars().all()
+                branch = branch.where(UserBot.user_id == user_id)
+            branches.append(branch.order_by(UserBot.last_activity.desc()).limit(_limit_param()))
+        
+        matches = union(*branches).subquery()
+        stmt = select(matches).order_by(matches.c.last_activity.desc()).limit(_limit_param())
+        
+        async with get_db_session() as session:
+            result = await session.execute(stmt, {"limit": limit})
+            return result.mappings().all()
     
     @staticmethod
     async def get_bots_with_ai(ai_type: Optional[str] = None, limit: int = 100):
         """Get bots with AI assistant enabled"""
-        from database.models import UserBot
+        stmt = lambda_stmt(lambda: select(*_BOT_LIST_COLUMNS).where(UserBot.ai_assistant_enabled == True))
+        if ai_type:
+            stmt += lambda s: s.where(UserBot.ai_assistant_type == ai_type)
+        stmt += lambda s: s.order_by(UserBot.last_activity.desc()).limit(_limit_param())
         
         async with get_db_session() as session:
-            conditions = [UserBot.ai_assistant_enabled == True]
-            
-            if ai_type:
-                conditions.append(UserBot.ai_assistant_type == ai_type)
-            
-            result = await session.execute(
-                select(UserBot)
-                .where(*conditions)
-                .order_by(UserBot.last_activity.desc())
-                .limit(limit)
-            )
-            return result.scalars().all()
+            result = await session.execute(stmt, {"limit": limit})
+            return result.mappings().all()
     
     @staticmethod
     async def get_recent_bots(limit: int = 20):
-        """Get recently created bots"""
-        from database.models import UserBot
+        """Get recently created bots (cached for 10 seconds per limit)"""
+        async def load():
+            stmt = lambda_stmt(lambda: select(*_BOT_LIST_COLUMNS).order_by(UserBot.created_at.desc()).limit(_limit_param()))
+            
+            async with get_db_session() as session:
+                result = await session.execute(stmt, {"limit": limit})
+                return result.mappings().all()
         
-        async with get_db_session() as session:
-            result = await session.execute(
-                select(UserBot)
-                .order_by(UserBot.created_at.desc())
-                .limit(limit)
-            )
-            return result.scalars().all()
+        return await _recent_bots_cache.get_or_load(limit, load)
     
     # ===== BOT MAINTENANCE =====
     
     @staticmethod
-    async def cleanup_inactive_bots(days: int = 90):
-        """Mark bots as inactive if no activity for specified days"""
-        from database.models import UserBot
+    async def cleanup_inactive_bots(days: int = 90, batch_size: int = 5000):
+        """Mark bots as inactive if no activity for specified days
         
+        Rows are updated in committed batches so row locks stay short-lived;
+        SKIP LOCKED lets concurrent writers and cleanups proceed.
+        """
         cutoff_date = datetime.now() - timedelta(days=days)
+        affected_count = 0
         
         async with get_db_session() as session:
-            result = await session.execute(
-                update(UserBot)
-                .where(
-                    UserBot.last_activity < cutoff_date,
-                    UserBot.status != 'inactive'
+            while True:
+                result = await session.execute(
+                    _CLEANUP_INACTIVE_BATCH,
+                    {"cutoff": cutoff_date, "batch_size": batch_size}
                 )
-                .values(status='inactive')
-            )
-            await session.commit()
-            
-            affected_count = result.rowcount
-            logger.info("🧹 Inactive bots cleanup completed", 
-                       days=days,
-                       affected_bots=affected_count)
-            
-            return affected_count
+                await session.commit()
+                
+                affected_count += result.rowcount
+                if result.rowcount < batch_size:
+                    break
+        
+        if affected_count:
+            _bots_summary_cache.invalidate()
+        
+        logger.info("🧹 Inactive bots cleanup completed", 
+                   days=days,
+                   affected_bots=affected_count)
+        
+        return affected_count
     
     @staticmethod
     async def get_bots_summary() -> dict:
-        """Get summary statistics for all bots"""
-        from database.models import UserBot
-        
+        """Get summary statistics for all bots (cached for 30 seconds)"""
+        return await _bots_summary_cache.get_or_load('bots_summary', BotManager._load_bots_summary)
+    
+    @staticmethod
+    async def _load_bots_summary() -> dict:
+        """Compute summary statistics for all bots in a single table scan"""
         async with get_db_session() as session:
-            # Total counts by status
-            status_result = await session.execute(
-                select(
-                    UserBot.status,
-                    func.count(UserBot.id).label('count')
-                ).group_by(UserBot.status)
+            # Distinct owners are counted once (as an InitPlan over the
+            # user_id-leading index) rather than per grouping set
+            unique_users = select(func.count()).select_from(
+                select(UserBot.user_id).distinct().subquery()
+            ).scalar_subquery()
+            
+            # GROUPING SETS yields the status groups, the AI type groups and
+            # the grand total from one pass; grouping() tells the rows apart
+            summary_query = select(
+                UserBot.status,
+                UserBot.ai_assistant_type,
+                func.grouping(UserBot.status).label('status_grouped'),
+                func.grouping(UserBot.ai_assistant_type).label('ai_type_grouped'),
+                func.count(UserBot.id).label('bots'),
+                func.count(UserBot.id).filter(UserBot.ai_assistant_enabled == True).label('ai_enabled_bots'),
+                unique_users.label('unique_users'),
+                func.sum(UserBot.total_messages_sent).label('total_messages'),
+                func.sum(UserBot.total_subscribers).label('total_subscribers'),
+                func.round(func.avg(cast(UserBot.ai_assistant_enabled, Integer)) * 100, 2).label('ai_adoption_rate')
+            ).group_by(
+                func.grouping_sets(UserBot.status, UserBot.ai_assistant_type, tuple_())
             )
-            status_counts = {row.status: row.count for row in status_result.fetchall()}
             
-            # AI assistant stats
-            ai_result = await session.execute(
-                select(
-                    UserBot.ai_assistant_type,
-                    func.count(UserBot.id).label('count')
-                ).where(UserBot.ai_assistant_enabled == True)
-                .group_by(UserBot.ai_assistant_type)
-            )
-            ai_counts = {row.ai_assistant_type: row.count for row in ai_result.fetchall()}
-            
-            # Total stats
-            total_result = await session.execute(
-                select(
-                    func.count(UserBot.id).label('total_bots'),
-                    func.count(func.distinct(UserBot.user_id)).label('unique_users'),
-                    func.sum(UserBot.total_messages_sent).label('total_messages'),
-                    func.sum(UserBot.total_subscribers).label('total_subscribers')
-                )
-            )
-            total_stats = total_result.first()
+            # A handful of grouping rows: one plain round trip, no server-side cursor
+            result = await session.execute(summary_query)
+            
+            status_counts = {}
+            ai_counts = {}
+            total_stats = None
+            for row in result:
+                if not row.status_grouped:
+                    status_counts[row.status] = row.bots
+                elif not row.ai_type_grouped:
+                    if row.ai_enabled_bots:
+                        ai_counts[row.ai_assistant_type] = row.ai_enabled_bots
+                else:
+                    total_stats = row
             
             return {
-                'total_bots': total_stats.total_bots or 0,
+                'total_bots': total_stats.bots or 0,
                 'unique_users': total_stats.unique_users or 0,
                 'total_messages_sent': int(total_stats.total_messages or 0),
                 'total_subscribers': int(total_stats.total_subscribers or 0),
                 'bots_by_status': status_counts,
                 'bots_by_ai_type': ai_counts,
-                'ai_enabled_bots': sum(ai_counts.values()),
-                'ai_adoption_rate': round(
-                    (sum(ai_counts.values()) / max(total_stats.total_bots or 1, 1)) * 100,
-                    2
-                )
+                'ai_enabled_bots': total_stats.ai_enabled_bots or 0,
+                'ai_adoption_rate': float(total_stats.ai_adoption_rate or 0)
             }
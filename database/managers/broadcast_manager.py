@@ -9,16 +9,242 @@ Responsibilities:
 - Funnel automation and subscriber management
 """
 
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-from typing import Optional, Union, List, Dict, Any
+from typing import Optional, Union, List, Dict, Any, Tuple
 from decimal import Decimal
-from sqlalchemy import select, update, delete, func
+from sqlalchemy import select, insert, update, delete, func, bindparam, literal, cast, Date, Float, Integer, Interval, Numeric
+from sqlalchemy.dialects.postgresql import JSONB, insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import text
 import structlog
 
+from database.models import (
+    BroadcastSequence, BroadcastMessage, MessageButton, ScheduledMessage, BotSubscriber,
+    BroadcastStatsDaily
+)
 from ..connection import get_db_session
+from ..ttl_cache import AsyncTTLCache
 
 logger = structlog.get_logger()
 
+# ===== PREBUILT STATEMENTS =====
+# Built once at import time; callers pass values for the bound parameters.
+# Read-only hot paths select table columns (Core rows with the same
+# attribute names) instead of hydrating ORM instances.
+
+_GET_SEQUENCE = (
+    select(BroadcastSequence)
+    .where(BroadcastSequence.bot_id == bindparam("bot_id"))
+)
+
+_GET_MESSAGES_BY_SEQUENCE = (
+    select(BroadcastMessage.__table__)
+    .where(BroadcastMessage.sequence_id == bindparam("sequence_id"))
+    .order_by(BroadcastMessage.message_number)
+)
+
+_GET_PENDING_SCHEDULED = (
+    select(
+        ScheduledMessage.id,
+        ScheduledMessage.bot_id,
+        ScheduledMessage.subscriber_id,
+        ScheduledMessage.message_id,
+        ScheduledMessage.scheduled_at
+    )
+    .where(
+        ScheduledMessage.status == 'pending',
+        ScheduledMessage.scheduled_at <= bindparam("now")
+    )
+    .order_by(ScheduledMessage.scheduled_at)
+    .limit(bindparam("limit", type_=Integer))
+)
+
+# Sender dispatch: flip due pending rows to 'processing' and return them in one
+# short transaction. SKIP LOCKED lets concurrent senders claim disjoint rows;
+# sending happens after the commit, with no locks or open transaction held
+_scheduled = ScheduledMessage.__table__
+_CLAIM_PENDING_SCHEDULED = (
+    update(_scheduled)
+    .where(
+        _scheduled.c.id.in_(
+            select(_scheduled.c.id)
+            .where(
+                _scheduled.c.status == 'pending',
+                _scheduled.c.scheduled_at <= bindparam("now")
+            )
+            .order_by(_scheduled.c.scheduled_at)
+            .limit(bindparam("limit", type_=Integer))
+            .with_for_update(skip_locked=True)
+        )
+    )
+    .values(status='processing', updated_at=bindparam("now"))
+    .returning(
+        _scheduled.c.id,
+        _scheduled.c.bot_id,
+        _scheduled.c.subscriber_id,
+        _scheduled.c.message_id,
+        _scheduled.c.scheduled_at
+    )
+)
+
+# Claims not finalised within this window (sender died mid-tick) may already
+# have been delivered, so they are failed rather than re-queued and re-sent
+_CLAIM_TIMEOUT = timedelta(minutes=10)
+
+_FAIL_STALE_CLAIMS = (
+    update(_scheduled)
+    .where(
+        _scheduled.c.status == 'processing',
+        _scheduled.c.updated_at < bindparam("stale_before")
+    )
+    .values(status='failed', error_message='Claim expired, delivery unconfirmed')
+    .returning(_scheduled.c.id)
+)
+
+_COUNT_PENDING_SCHEDULED = (
+    select(func.count())
+    .select_from(ScheduledMessage)
+    .where(
+        ScheduledMessage.status == 'pending',
+        ScheduledMessage.scheduled_at <= bindparam("now")
+    )
+)
+
+_UPDATE_SCHEDULED_STATUS = (
+    update(ScheduledMessage)
+    .where(ScheduledMessage.id == bindparam("scheduled_id"))
+    .values(
+        status=bindparam("status"),
+        sent_at=bindparam("sent_at"),
+        error_message=bindparam("error_message")
+    )
+    .execution_options(synchronize_session=False)
+)
+
+_BULK_MARK_SENT = (
+    update(ScheduledMessage)
+    .where(ScheduledMessage.id.in_(bindparam("ids", expanding=True)))
+    .values(status='sent', sent_at=bindparam("sent_at"), error_message=None)
+    .execution_options(synchronize_session=False)
+)
+
+# Core table update so a list of parameter sets runs as one asyncpg executemany
+_MARK_FAILED = (
+    update(ScheduledMessage.__table__)
+    .where(ScheduledMessage.__table__.c.id == bindparam("mid"))
+    .values(status='failed', sent_at=None, error_message=bindparam("err"))
+)
+
+# cleanup_old_scheduled_messages: one committed batch of finished rows
+_CLEANUP_SCHEDULED_BATCH = text("""
+    DELETE FROM scheduled_messages
+    WHERE id IN (
+        SELECT id FROM scheduled_messages
+        WHERE status IN ('sent', 'failed', 'cancelled') AND updated_at < :cutoff
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    )
+""")
+
+# get_broadcast_summary: sequence, message and button counters in one round trip.
+# Plain SQL run through exec_driver_sql, no bind parameters or ORM processing.
+_SUMMARY_COUNTS = """
+    WITH s AS (
+        SELECT count(*) AS total, count(*) FILTER (WHERE is_enabled) AS enabled FROM broadcast_sequences
+    ), m AS (
+        SELECT count(*) AS total, count(*) FILTER (WHERE is_active) AS active FROM broadcast_messages
+    ), b AS (
+        SELECT count(*) AS total FROM message_buttons
+    )
+    SELECT s.total AS sequences_total, s.enabled AS sequences_enabled,
+           m.total AS messages_total, m.active AS messages_active,
+           b.total AS buttons_total
+    FROM s, m, b
+"""
+
+_GET_SEQUENCE_ID = (
+    select(BroadcastSequence.id)
+    .where(BroadcastSequence.bot_id == bindparam("bot_id"))
+)
+
+def _status_rollup(status, count, *criteria):
+    """Per-status count with share of total, percentages computed by Postgres"""
+    total = func.sum(count).over()
+    return (
+        select(
+            status,
+            count.label('count'),
+            total.label('total'),
+            func.round(cast(count, Numeric) * 100 / total, 2).label('pct')
+        )
+        .where(*criteria)
+        .group_by(status)
+    )
+
+def _delivery_rate(count, total):
+    """round(count * 100 / total, 2), 0 when there is nothing scheduled"""
+    return func.coalesce(func.round(cast(count, Numeric) * 100 / func.nullif(total, 0), 2), 0)
+
+
+_SCHEDULED_STATUSES = ('pending', 'sent', 'failed', 'cancelled')
+
+# get_message_performance_stats: message info, per-status counts and rates in
+# one row; positions follow _MESSAGE_INFO_KEYS, _SCHEDULED_STATUSES, then
+# total and the three rates
+_MESSAGE_INFO_KEYS = ('id', 'message_number', 'delay_hours', 'is_active', 'has_media')
+_message_status_counts = {
+    status: func.count(ScheduledMessage.id).filter(ScheduledMessage.status == status)
+    for status in _SCHEDULED_STATUSES
+}
+_message_total = func.count(ScheduledMessage.id)
+_GET_MESSAGE_PERFORMANCE = (
+    select(
+        BroadcastMessage.id,
+        BroadcastMessage.message_number,
+        cast(BroadcastMessage.delay_hours, Float),
+        BroadcastMessage.is_active,
+        func.coalesce(
+            func.nullif(BroadcastMessage.media_url, ''),
+            func.nullif(BroadcastMessage.media_file_id, '')
+        ).isnot(None),
+        *_message_status_counts.values(),
+        _message_total,
+        cast(_delivery_rate(_message_status_counts['sent'], _message_total), Float),
+        cast(_delivery_rate(_message_status_counts['failed'], _message_total), Float),
+        cast(_delivery_rate(_message_status_counts['pending'], _message_total), Float)
+    )
+    .select_from(BroadcastMessage)
+    .outerjoin(ScheduledMessage, ScheduledMessage.message_id == BroadcastMessage.id)
+    .where(BroadcastMessage.id == bindparam("message_id"))
+    .group_by(BroadcastMessage.id)
+)
+_PERFORMANCE_KEYS = ('total_scheduled', 'delivery_rate', 'failure_rate', 'pending_rate')
+
+# get_broadcast_summary result; dropped on sequence/message/button writes
+# and when the daily stats rollup is refreshed
+_broadcast_summary_cache = AsyncTTLCache(ttl=30)
+
+# bot_id -> sequence id; changes only when a sequence is created or deleted
+_sequence_id_cache = AsyncTTLCache(ttl=300, maxsize=4096)
+
+
+@asynccontextmanager
+async def _session(session: Optional[AsyncSession] = None):
+    """Use the caller's session as-is, or open (and commit) a new one
+    
+    Methods accepting ``session`` never commit a borrowed session, so a
+    caller can run several operations in one transaction. They also leave
+    process caches alone then; the caller invalidates them after its commit
+    (invalidate_summary_cache / invalidate_sequence_cache).
+    """
+    if session is not None:
+        yield session
+        return
+    
+    async with get_db_session() as new_session:
+        yield new_session
+
 
 class BroadcastManager:
     """Manager for broadcast sequences and scheduled messages operations"""
@@ -26,89 +252,104 @@ class BroadcastManager:
     # ===== BROADCAST SEQUENCE MANAGEMENT =====
     
     @staticmethod
-    async def create_broadcast_sequence(bot_id: str):
-        """Create broadcast sequence for bot"""
-        from database.models import BroadcastSequence
-        
-        async with get_db_session() as session:
-            sequence = BroadcastSequence(bot_id=bot_id, is_enabled=True)
-            session.add(sequence)
-            await session.commit()
-            await session.refresh(sequence)
-            
-            logger.info("✅ Broadcast sequence created", 
-                       bot_id=bot_id,
-                       sequence_id=sequence.id)
-            
-            return sequence
+    def invalidate_summary_cache() -> None:
+        """Drop the cached broadcast summary after sequences, messages or buttons changed"""
+        _broadcast_summary_cache.invalidate()
     
     @staticmethod
-    async def get_broadcast_sequence(bot_id: str):
-        """Get broadcast sequence for bot"""
-        from database.models import BroadcastSequence
+    def invalidate_sequence_cache(bot_id: str) -> None:
+        """Drop cached sequence data for bot after its sequence was created or deleted"""
+        _sequence_id_cache.invalidate(bot_id)
+        _broadcast_summary_cache.invalidate()
+    
+    @staticmethod
+    async def create_broadcast_sequence(bot_id: str, session: Optional[AsyncSession] = None):
+        """Create broadcast sequence for bot
         
-        async with get_db_session() as session:
-            result = await session.execute(
-                select(BroadcastSequence).where(BroadcastSequence.bot_id == bot_id)
+        With a borrowed ``session`` the insert is not committed here, so the
+        caller must call invalidate_sequence_cache(bot_id) after its commit.
+        """
+        async with _session(session) as active_session:
+            # RETURNING loads id and server defaults without a refresh SELECT
+            result = await active_session.execute(
+                insert(BroadcastSequence)
+                .values(bot_id=bot_id, is_enabled=True)
+                .returning(BroadcastSequence)
             )
+            sequence = result.scalar_one()
+        
+        # Only after commit, or a concurrent reader could re-cache the old state
+        if session is None:
+            BroadcastManager.invalidate_sequence_cache(bot_id)
+        
+        logger.info("✅ Broadcast sequence created", 
+                   bot_id=bot_id,
+                   sequence_id=sequence.id)
+        
+        return sequence
+    
+    @staticmethod
+    async def get_broadcast_sequence(bot_id: str, session: Optional[AsyncSession] = None):
+        """Get broadcast sequence for bot"""
+        async with _session(session) as session:
+            result = await session.execute(_GET_SEQUENCE, {"bot_id": bot_id})
             return result.scalar_one_or_none()
     
     @staticmethod
-    async def update_broadcast_sequence_status(bot_id: str, enabled: bool):
-        """Enable/disable broadcast sequence"""
-        from database.models import BroadcastSequence
+    async def get_sequence_id_cached(bot_id: str) -> Optional[int]:
+        """Get broadcast sequence id for bot, cached in-process
         
-        async with get_db_session() as session:
-            await session.execute(
+        Missing sequences aren't cached: a sequence created by another
+        process or the legacy path must be visible on the next call.
+        """
+        async def load():
+            async with get_db_session() as session:
+                result = await session.execute(_GET_SEQUENCE_ID, {"bot_id": bot_id})
+                return result.scalar_one_or_none()
+        
+        return await _sequence_id_cache.get_or_load(bot_id, load, cache_none=False)
+    
+    @staticmethod
+    async def update_broadcast_sequence_status(bot_id: str, enabled: bool, session: Optional[AsyncSession] = None):
+        """Enable/disable broadcast sequence"""
+        async with _session(session) as active_session:
+            await active_session.execute(
                 update(BroadcastSequence)
                 .where(BroadcastSequence.bot_id == bot_id)
                 .values(is_enabled=enabled, updated_at=datetime.now())
             )
-            await session.commit()
-            
-            logger.info("✅ Broadcast sequence status updated", 
-                       bot_id=bot_id,
-                       enabled=enabled)
+        
+        if session is None:
+            BroadcastManager.invalidate_summary_cache()
+        
+        logger.info("✅ Broadcast sequence status updated", 
+                   bot_id=bot_id,
+                   enabled=enabled)
     
     @staticmethod
-    async def delete_broadcast_sequence(bot_id: str):
-        """Delete broadcast sequence and all related messages"""
-        from database.models import BroadcastSequence, BroadcastMessage, MessageButton
+    async def delete_broadcast_sequence(bot_id: str, session: Optional[AsyncSession] = None):
+        """Delete broadcast sequence and all related messages
         
-        async with get_db_session() as session:
-            # Get sequence ID first
-            sequence_result = await session.execute(
-                select(BroadcastSequence.id).where(BroadcastSequence.bot_id == bot_id)
+        Messages, their buttons and scheduled sends are removed by the
+        ON DELETE CASCADE foreign keys, so a single DELETE is enough.
+        With a borrowed ``session`` the caller must call
+        invalidate_sequence_cache(bot_id) after its commit.
+        """
+        async with _session(session) as active_session:
+            result = await active_session.execute(
+                delete(BroadcastSequence)
+                .where(BroadcastSequence.bot_id == bot_id)
+                .returning(BroadcastSequence.id)
             )
-            sequence_id = sequence_result.scalar_one_or_none()
+            sequence_id = result.scalar_one_or_none()
+        
+        if sequence_id:
+            if session is None:
+                BroadcastManager.invalidate_sequence_cache(bot_id)
             
-            if sequence_id:
-                # Delete message buttons first
-                await session.execute(
-                    delete(MessageButton)
-                    .where(MessageButton.message_id.in_(
-                        select(BroadcastMessage.id)
-                        .where(BroadcastMessage.sequence_id == sequence_id)
-                    ))
-                )
-                
-                # Delete broadcast messages
-                await session.execute(
-                    delete(BroadcastMessage)
-                    .where(BroadcastMessage.sequence_id == sequence_id)
-                )
-                
-                # Delete sequence
-                await session.execute(
-                    delete(BroadcastSequence)
-                    .where(BroadcastSequence.bot_id == bot_id)
-                )
-                
-                await session.commit()
-                
-                logger.info("✅ Broadcast sequence deleted", 
-                           bot_id=bot_id,
-                           sequence_id=sequence_id)
+            logger.info("✅ Broadcast sequence deleted", 
+                       bot_id=bot_id,
+                       sequence_id=sequence_id)
     
     # ===== BROADCAST MESSAGES MANAGEMENT =====
     
@@ -123,79 +364,66 @@ class BroadcastManager:
         media_file_id: Optional[str] = None,
         media_file_unique_id: Optional[str] = None,
         media_file_size: Optional[int] = None,
-        media_filename: Optional[str] = None
+        media_filename: Optional[str] = None,
+        session: Optional[AsyncSession] = None
     ):
         """Create broadcast message with Decimal conversion handling"""
-        from database.models import BroadcastMessage
-        
-        async with get_db_session() as session:
-            # Check for existing message number in sequence
-            existing_result = await session.execute(
-                select(BroadcastMessage).where(
-                    BroadcastMessage.sequence_id == sequence_id,
-                    BroadcastMessage.message_number == message_number
+        async with _session(session) as active_session:
+            # Convert delay_hours to Decimal for database storage
+            delay_decimal = Decimal(str(delay_hours))
+            
+            # Duplicate numbers are rejected atomically by uq_sequence_message_number
+            result = await active_session.execute(
+                pg_insert(BroadcastMessage)
+                .values(
+                    sequence_id=sequence_id,
+                    message_number=message_number,
+                    message_text=message_text,
+                    delay_hours=delay_decimal,
+                    media_url=media_url,
+                    media_type=media_type,
+                    media_file_id=media_file_id,
+                    media_file_unique_id=media_file_unique_id,
+                    media_file_size=media_file_size,
+                    media_filename=media_filename
                 )
+                .on_conflict_do_nothing(constraint='uq_sequence_message_number')
+                .returning(BroadcastMessage)
             )
-            existing_message = existing_result.scalar_one_or_none()
+            message = result.scalar_one_or_none()
             
-            if existing_message:
+            if message is None:
                 logger.warning(
                     "Message number already exists", 
                     sequence_id=sequence_id,
-                    message_number=message_number,
-                    existing_message_id=existing_message.id
+                    message_number=message_number
                 )
                 raise ValueError(f"Message number {message_number} already exists in sequence {sequence_id}")
-            
-            # Convert delay_hours to Decimal for database storage
-            delay_decimal = Decimal(str(delay_hours))
-            
-            # Create message with new media fields
-            message = BroadcastMessage(
-                sequence_id=sequence_id,
-                message_number=message_number,
-                message_text=message_text,
-                delay_hours=delay_decimal,
-                media_url=media_url,
-                media_type=media_type,
-                media_file_id=media_file_id,
-                media_file_unique_id=media_file_unique_id,
-                media_file_size=media_file_size,
-                media_filename=media_filename
-            )
-            session.add(message)
-            await session.commit()
-            await session.refresh(message)
-            
-            logger.info("✅ Broadcast message created", 
-                       message_id=message.id,
-                       sequence_id=sequence_id,
-                       message_number=message_number,
-                       delay_hours_original=delay_hours,
-                       delay_hours_stored=float(message.delay_hours),
-                       has_media=bool(media_url or media_file_id))
-            
-            return message
+        
+        if session is None:
+            BroadcastManager.invalidate_summary_cache()
+        
+        logger.info("✅ Broadcast message created", 
+                   message_id=message.id,
+                   sequence_id=sequence_id,
+                   message_number=message_number,
+                   delay_hours_original=delay_hours,
+                   delay_hours_stored=float(message.delay_hours),
+                   has_media=bool(media_url or media_file_id))
+        
+        return message
     
     @staticmethod
-    async def get_broadcast_messages(sequence_id: int):
+    async def get_broadcast_messages(sequence_id: int, session: Optional[AsyncSession] = None):
         """Get all broadcast messages for sequence"""
-        from database.models import BroadcastMessage
-        
-        async with get_db_session() as session:
-            result = await session.execute(
-                select(BroadcastMessage)
-                .where(BroadcastMessage.sequence_id == sequence_id)
-                .order_by(BroadcastMessage.message_number)
-            )
-            return result.scalars().all()
+        async with _session(session) as session:
+            result = await session.execute(_GET_MESSAGES_BY_SEQUENCE, {"sequence_id": sequence_id})
+            return result.all()
     
     @staticmethod
-    async def get_broadcast_message_by_id(message_id: int):
+    async def get_broadcast_message_by_id(message_id: int, session: Optional[AsyncSession] = None):
         """Get broadcast message by ID"""
-        from database.models import BroadcastMessage
-        
-        async with get_db_session() as session:
+        async with _session(session) as session:
             result = await session.execute(
                 select(BroadcastMessage).where(BroadcastMessage.id == message_id)
             )
@@ -214,135 +442,147 @@ class BroadcastManager:
         media_file_id: Optional[str] = None,
         media_file_unique_id: Optional[str] = None,
         media_file_size: Optional[int] = None,
-        media_filename: Optional[str] = None
+        media_filename: Optional[str] = None,
+        session: Optional[AsyncSession] = None
     ):
-        """Update broadcast message with Decimal conversion"""
-        from database.models import BroadcastMessage
+        """Update broadcast message with Decimal conversion
         
-        async with get_db_session() as session:
-            update_data = {}
+        A delay change reschedules pending sends in the same transaction.
+        """
+        update_data = {}
+        
+        if message_text is not None:
+            update_data["message_text"] = message_text
+        if delay_hours is not None:
+            # Convert to Decimal for database storage
+            update_data["delay_hours"] = Decimal(str(delay_hours))
+        if media_url is not None:
+            update_data["media_url"] = media_url
+        if media_type is not None:
+            update_data["media_type"] = media_type
+        if is_active is not None:
+            update_data["is_active"] = is_active
+        if utm_campaign is not None:
+            update_data["utm_campaign"] = utm_campaign
+        if utm_content is not None:
+            update_data["utm_content"] = utm_content
+        if media_file_id is not None:
+            update_data["media_file_id"] = media_file_id
+        if media_file_unique_id is not None:
+            update_data["media_file_unique_id"] = media_file_unique_id
+        if media_file_size is not None:
+            update_data["media_file_size"] = media_file_size
+        if media_filename is not None:
+            update_data["media_filename"] = media_filename
+        
+        if not update_data:
+            return
+        
+        update_data["updated_at"] = datetime.now()
+        
+        async with _session(session) as active_session:
+            await active_session.execute(
+                update(BroadcastMessage)
+                .where(BroadcastMessage.id == message_id)
+                .values(**update_data)
+            )
             
-            if message_text is not None:
-                update_data["message_text"] = message_text
+            rescheduled = 0
             if delay_hours is not None:
-                # Convert to Decimal for database storage
-                update_data["delay_hours"] = Decimal(str(delay_hours))
                 # Reschedule pending messages with new delay
-                await BroadcastManager.reschedule_pending_messages(message_id, float(delay_hours))
-            if media_url is not None:
-                update_data["media_url"] = media_url
-            if media_type is not None:
-                update_data["media_type"] = media_type
-            if is_active is not None:
-                update_data["is_active"] = is_active
-            if utm_campaign is not None:
-                update_data["utm_campaign"] = utm_campaign
-            if utm_content is not None:
-                update_data["utm_content"] = utm_content
-            if media_file_id is not None:
-                update_data["media_file_id"] = media_file_id
-            if media_file_unique_id is not None:
-                update_data["media_file_unique_id"] = media_file_unique_id
-            if media_file_size is not None:
-                update_data["media_file_size"] = media_file_size
-            if media_filename is not None:
-                update_data["media_filename"] = media_filename
-            
-            if update_data:
-                update_data["updated_at"] = datetime.now()
-                await session.execute(
-                    update(BroadcastMessage)
-                    .where(BroadcastMessage.id == message_id)
-                    .values(**update_data)
+                rescheduled = await BroadcastManager._reschedule_pending_messages_in_session(
+                    active_session, message_id, float(delay_hours)
                 )
-                await session.commit()
-                
-                logger.info("✅ Broadcast message updated",
-                           message_id=message_id,
-                           delay_hours_updated=delay_hours is not None,
-                           utm_updated=utm_campaign is not None or utm_content is not None,
-                           media_updated=any([
-                               media_url is not None,
-                               media_file_id is not None,
-                               media_type is not None
-                           ]))
-    
-    @staticmethod
-    async def delete_broadcast_message(message_id: int):
-        """Delete broadcast message"""
-        from database.models import BroadcastMessage, MessageButton
         
-        async with get_db_session() as session:
+        if session is None:
+            BroadcastManager.invalidate_summary_cache()
+        
+        logger.info("✅ Broadcast message updated",
+                   message_id=message_id,
+                   delay_hours_updated=delay_hours is not None,
+                   rescheduled_messages=rescheduled,
+                   utm_updated=utm_campaign is not None or utm_content is not None,
+                   media_updated=any([
+                       media_url is not None,
+                       media_file_id is not None,
+                       media_type is not None
+                   ]))
+    
+    @staticmethod
+    async def delete_broadcast_message(message_id: int, session: Optional[AsyncSession] = None):
+        """Delete broadcast message"""
+        async with _session(session) as active_session:
             # Delete message buttons first
-            await session.execute(
+            await active_session.execute(
                 delete(MessageButton).where(MessageButton.message_id == message_id)
             )
             
             # Delete the message
-            message = await session.get(BroadcastMessage, message_id)
+            message = await active_session.get(BroadcastMessage, message_id)
             if message:
-                await session.delete(message)
-                await session.commit()
-                
-                logger.info("✅ Broadcast message deleted", 
-                           message_id=message_id)
+                await active_session.delete(message)
+        
+        if message:
+            if session is None:
+                BroadcastManager.invalidate_summary_cache()
+            
+            logger.info("✅ Broadcast message deleted", 
+                       message_id=message_id)
     
     @staticmethod
-    async def reschedule_pending_messages(message_id: int, new_delay_hours: float):
-        """Reschedule pending messages when delay changes"""
-        from database.models import ScheduledMessage, BroadcastMessage, BotSubscriber
+    async def reschedule_pending_messages(message_id: int, new_delay_hours: float) -> int:
+        """Reschedule pending messages when delay changes, return affected count
         
+        Errors are logged and re-raised; get_db_session rolls the transaction back.
+        """
         async with get_db_session() as session:
             try:
-                # Get all pending messages for this message_id
-                result = await session.execute(
-                    select(ScheduledMessage, BroadcastMessage)
-                    .join(BroadcastMessage, ScheduledMessage.message_id == BroadcastMessage.id)
-                    .where(
-                        BroadcastMessage.id == message_id,
-                        ScheduledMessage.status == 'pending'
-                    )
+                affected = await BroadcastManager._reschedule_pending_messages_in_session(
+                    session, message_id, new_delay_hours
                 )
-                
-                scheduled_messages = result.fetchall()
-                
-                if not scheduled_messages:
-                    logger.info("No pending messages to reschedule", message_id=message_id)
-                    return
-                
-                # Recalculate time for each message
-                for scheduled_msg, broadcast_msg in scheduled_messages:
-                    # Find when user clicked button (funnel_started_at)
-                    subscriber_result = await session.execute(
-                        select(BotSubscriber.funnel_started_at)
-                        .where(BotSubscriber.user_id == scheduled_msg.subscriber_id)
-                        .where(BotSubscriber.bot_id == scheduled_msg.bot_id)
-                    )
-                    subscriber = subscriber_result.scalar_one_or_none()
-                    
-                    if subscriber and subscriber:
-                        # Recalculate scheduled_at
-                        new_scheduled_at = subscriber + timedelta(hours=float(new_delay_hours))
-                        
-                        # Update record
-                        await session.execute(
-                            update(ScheduledMessage)
-                            .where(ScheduledMessage.id == scheduled_msg.id)
-                            .values(scheduled_at=new_scheduled_at)
-                        )
-                
-                await session.commit()
-                
-                logger.info("✅ Rescheduled pending messages", 
-                           message_id=message_id,
-                           new_delay_hours=new_delay_hours,
-                           affected_messages=len(scheduled_messages))
-                
             except Exception as e:
                 logger.error("💥 Failed to reschedule pending messages", 
                             message_id=message_id, 
                             error=str(e))
-                await session.rollback()
+                raise
+            
+            if not affected:
+                logger.info("No pending messages to reschedule", message_id=message_id)
+                return 0
+            
+            logger.info("✅ Rescheduled pending messages", 
+                       message_id=message_id,
+                       new_delay_hours=new_delay_hours,
+                       affected_messages=affected)
+            
+            return affected
+    
+    @staticmethod
+    async def _reschedule_pending_messages_in_session(
+        session,
+        message_id: int,
+        new_delay_hours: float
+    ) -> int:
+        """Recompute pending send times in the caller's transaction, return affected rows
+        
+        New send times are computed server-side from each subscriber's
+        funnel_started_at in a single UPDATE ... FROM bot_subscribers.
+        """
+        result = await session.execute(
+            update(ScheduledMessage)
+            .where(
+                ScheduledMessage.message_id == message_id,
+                ScheduledMessage.status == 'pending',
+                BotSubscriber.user_id == ScheduledMessage.subscriber_id,
+                BotSubscriber.bot_id == ScheduledMessage.bot_id,
+                BotSubscriber.funnel_started_at.isnot(None)
+            )
+            .values(
+                scheduled_at=BotSubscriber.funnel_started_at + timedelta(hours=float(new_delay_hours))
+            )
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
     
     # ===== MESSAGE BUTTONS MANAGEMENT =====
     
@@ -351,53 +591,55 @@ class BroadcastManager:
         message_id: int,
         button_text: str,
         button_url: str,
-        position: int
+        position: int,
+        session: Optional[AsyncSession] = None
     ):
         """Create message button"""
-        from database.models import MessageButton
-        
-        async with get_db_session() as session:
-            button = MessageButton(
-                message_id=message_id,
-                button_text=button_text,
-                button_url=button_url,
-                position=position
+        async with _session(session) as active_session:
+            # RETURNING loads id and server defaults without a refresh SELECT
+            result = await active_session.execute(
+                insert(MessageButton)
+                .values(
+                    message_id=message_id,
+                    button_text=button_text,
+                    button_url=button_url,
+                    position=position
+                )
+                .returning(MessageButton)
             )
-            session.add(button)
-            await session.commit()
-            await session.refresh(button)
-            
-            logger.info("✅ Message button created", 
-                       button_id=button.id,
-                       message_id=message_id,
-                       position=position)
-            
-            return button
+            button = result.scalar_one()
+        
+        if session is None:
+            BroadcastManager.invalidate_summary_cache()
+        
+        logger.info("✅ Message button created", 
+                   button_id=button.id,
+                   message_id=message_id,
+                   position=position)
+        
+        return button
     
     @staticmethod
-    async def get_message_buttons(message_id: int):
+    async def get_message_buttons(message_id: int, session: Optional[AsyncSession] = None):
         """Get buttons for message"""
-        from database.models import MessageButton
-        
-        async with get_db_session() as session:
+        async with _session(session) as session:
             result = await session.execute(
-                select(MessageButton)
+                select(MessageButton.__table__)
                 .where(MessageButton.message_id == message_id)
                 .order_by(MessageButton.position)
             )
-            return result.scalars().all()
+            return result.all()
     
     @staticmethod
     async def update_message_button(
         button_id: int,
         button_text: Optional[str] = None,
         button_url: Optional[str] = None,
-        position: Optional[int] = None
+        position: Optional[int] = None,
+        session: Optional[AsyncSession] = None
     ):
         """Update message button"""
-        from database.models import MessageButton
-        
-        async with get_db_session() as session:
+        async with _session(session) as session:
             update_data = {}
             
             if button_text is not None:
@@ -413,24 +655,24 @@ class BroadcastManager:
                     .where(MessageButton.id == button_id)
                     .values(**update_data)
                 )
-                await session.commit()
                 
                 logger.info("✅ Message button updated", 
                            button_id=button_id,
                            fields_updated=list(update_data.keys()))
     
     @staticmethod
-    async def delete_message_button(button_id: int):
+    async def delete_message_button(button_id: int, session: Optional[AsyncSession] = None):
         """Delete message button"""
-        from database.models import MessageButton
-        
-        async with get_db_session() as session:
-            button = await session.get(MessageButton, button_id)
+        async with _session(session) as active_session:
+            button = await active_session.get(MessageButton, button_id)
             if button:
-                await session.delete(button)
-                await session.commit()
-                
-                logger.info("✅ Message button deleted", button_id=button_id)
+                await active_session.delete(button)
+        
+        if button:
+            if session is None:
+                BroadcastManager.invalidate_summary_cache()
+            
+            logger.info("✅ Message button deleted", button_id=button_id)
     
     # ===== SCHEDULED MESSAGES MANAGEMENT =====
     
@@ -438,79 +680,100 @@ class BroadcastManager:
     async def schedule_broadcast_messages_for_subscriber(
         bot_id: str,
         subscriber_id: int,
-        sequence_id: int
-    ):
-        """Schedule all broadcast messages for new subscriber with Decimal handling"""
-        from database.models import BroadcastMessage, ScheduledMessage
+        sequence_id: Optional[int] = None,
+        session: Optional[AsyncSession] = None
+    ) -> int:
+        """Schedule all active broadcast messages for new subscriber, return scheduled count
         
-        async with get_db_session() as session:
-            # Get all active messages in sequence
+        Send times are computed in one INSERT ... SELECT from broadcast_messages,
+        so messages never travel to Python. The sequence is looked up from the
+        bot when sequence_id is not given.
+        """
+        if sequence_id is None:
+            sequence_id = await BroadcastManager.get_sequence_id_cached(bot_id)
+            if sequence_id is None:
+                return 0
+        
+        # Base time comes from the app clock like every other naive scheduled_at
+        scheduled_at = (
+            literal(datetime.now())
+            + BroadcastMessage.delay_hours * literal(timedelta(hours=1), Interval)
+        )
+        
+        async with _session(session) as session:
             result = await session.execute(
-                select(BroadcastMessage)
-                .where(
-                    BroadcastMessage.sequence_id == sequence_id,
-                    BroadcastMessage.is_active == True
+                insert(ScheduledMessage).from_select(
+                    ["bot_id", "subscriber_id", "message_id", "scheduled_at", "status"],
+                    select(
+                        # Column types: Telegram ids overflow INTEGER
+                        literal(bot_id, ScheduledMessage.bot_id.type),
+                        literal(subscriber_id, ScheduledMessage.subscriber_id.type),
+                        BroadcastMessage.id,
+                        scheduled_at,
+                        literal('pending', ScheduledMessage.status.type)
+                    ).where(
+                        BroadcastMessage.sequence_id == sequence_id,
+                        BroadcastMessage.is_active == True
+                    )
                 )
-                .order_by(BroadcastMessage.message_number)
             )
-            messages = result.scalars().all()
-            
-            base_time = datetime.now()
-            scheduled_messages = []
-            
-            for message in messages:
-                # Convert Decimal to float for timedelta calculation
-                try:
-                    delay_hours_float = float(message.delay_hours)
-                    scheduled_at = base_time + timedelta(hours=delay_hours_float)
-                    
-                    scheduled_message = ScheduledMessage(
-                        bot_id=bot_id,
-                        subscriber_id=subscriber_id,
-                        message_id=message.id,
-                        scheduled_at=scheduled_at,
-                        status='pending'
-                    )
-                    session.add(scheduled_message)
-                    scheduled_messages.append(scheduled_message)
-                    
-                except (ValueError, TypeError) as e:
-                    logger.error("Failed to convert delay_hours",
-                               message_id=message.id,
-                               delay_hours_value=message.delay_hours,
-                               delay_hours_type=type(message.delay_hours),
-                               error=str(e))
-                    continue  # Skip this message
-            
-            await session.commit()
             
             logger.info(
-                "✅ Broadcast messages scheduled with Decimal conversion", 
+                "✅ Broadcast messages scheduled", 
                 bot_id=bot_id,
                 subscriber_id=subscriber_id,
-                messages_count=len(scheduled_messages),
-                total_messages=len(messages),
-                delays=[float(msg.delay_hours) for msg in messages]
+                sequence_id=sequence_id,
+                messages_count=result.rowcount
             )
             
-            return scheduled_messages
+            return result.rowcount
     
     @staticmethod
     async def get_pending_scheduled_messages(limit: int = 100):
         """Get pending scheduled messages ready to send"""
-        from database.models import ScheduledMessage
+        async with get_db_session() as session:
+            result = await session.execute(
+                _GET_PENDING_SCHEDULED,
+                {"now": datetime.now(), "limit": limit}
+            )
+            return result.all()
+    
+    @staticmethod
+    async def count_pending_scheduled_messages() -> int:
+        """Count pending scheduled messages that are due now"""
+        async with get_db_session() as session:
+            result = await session.execute(
+                _COUNT_PENDING_SCHEDULED,
+                {"now": datetime.now()}
+            )
+            return result.scalar_one()
+    
+    @staticmethod
+    async def claim_pending_scheduled_messages(limit: int = 100) -> List[Any]:
+        """Claim due pending messages for sending and return them
         
+        Claimed rows are 'processing' until bulk_mark_sent / bulk_mark_failed
+        finalise them; rows left 'processing' longer than _CLAIM_TIMEOUT are
+        marked failed on a later claim.
+        """
+        now = datetime.now()
         async with get_db_session() as session:
+            stale = await session.execute(_FAIL_STALE_CLAIMS, {"stale_before": now - _CLAIM_TIMEOUT})
+            stale_ids = stale.scalars().all()
+            if stale_ids:
+                logger.warning("⚠️ Expired scheduled message claims marked failed",
+                             count=len(stale_ids),
+                             message_ids=stale_ids)
+            
             result = await session.execute(
-                select(ScheduledMessage)
-                .where(
-                    ScheduledMessage.status == 'pending',
-                    ScheduledMessage.scheduled_at <= datetime.now()
-                )
-                .order_by(ScheduledMessage.scheduled_at)
-                .limit(limit)
+                _CLAIM_PENDING_SCHEDULED,
+                {"now": now, "limit": limit}
             )
-            return result.scalars().all()
+            rows = result.all()
+        
+        # RETURNING order is unspecified; send the oldest first
+        rows.sort(key=lambda row: row.scheduled_at)
+        return rows
     
     @staticmethod
     async def update_scheduled_message_status(
@@ -519,19 +782,15 @@ class BroadcastManager:
         error_message: Optional[str] = None
     ):
         """Update scheduled message status"""
-        from database.models import ScheduledMessage
-        
         async with get_db_session() as session:
-            update_data = {
-                "status": status,
-                "sent_at": datetime.now() if status == 'sent' else None,
-                "error_message": error_message
-            }
-            
             await session.execute(
-                update(ScheduledMessage)
-                .where(ScheduledMessage.id == message_id)
-                .values(**update_data)
+                _UPDATE_SCHEDULED_STATUS,
+                {
+                    "scheduled_id": message_id,
+                    "status": status,
+                    "sent_at": datetime.now() if status == 'sent' else None,
+                    "error_message": error_message
+                }
             )
             await session.commit()
             
@@ -540,34 +799,60 @@ class BroadcastManager:
                        status=status,
                        has_error=bool(error_message))
     
+    @staticmethod
+    async def bulk_mark_sent(ids: List[int]) -> int:
+        """Mark scheduled messages as sent in one UPDATE"""
+        if not ids:
+            return 0
+        
+        async with get_db_session() as session:
+            result = await session.execute(
+                _BULK_MARK_SENT,
+                {"ids": list(ids), "sent_at": datetime.now()}
+            )
+            await session.commit()
+            
+            logger.info("✅ Scheduled messages marked as sent", 
+                       requested=len(ids),
+                       updated=result.rowcount)
+            return result.rowcount
+    
+    @staticmethod
+    async def bulk_mark_failed(items: List[Tuple[int, str]]) -> int:
+        """Mark scheduled messages as failed with per-message errors in one executemany"""
+        if not items:
+            return 0
+        
+        async with get_db_session() as session:
+            await session.execute(
+                _MARK_FAILED,
+                [{"mid": message_id, "err": error} for message_id, error in items]
+            )
+            await session.commit()
+            
+            logger.info("✅ Scheduled messages marked as failed", count=len(items))
+            return len(items)
+    
     @staticmethod
     async def get_scheduled_messages_stats(bot_id: str):
         """Get statistics for scheduled messages"""
-        from database.models import ScheduledMessage
-        
         async with get_db_session() as session:
-            # Count by status
+            # Count by status; two plain columns feed dict() directly
             result = await session.execute(
-                select(
-                    ScheduledMessage.status,
-                    func.count(ScheduledMessage.id).label('count')
-                )
+                select(ScheduledMessage.status, func.count(ScheduledMessage.id))
                 .where(ScheduledMessage.bot_id == bot_id)
                 .group_by(ScheduledMessage.status)
             )
             
             stats = {'pending': 0, 'sent': 0, 'failed': 0, 'cancelled': 0}
-            for row in result.fetchall():
-                stats[row.status] = row.count
+            stats.update(result.tuples().all())
             
             return stats
     
     @staticmethod
-    async def cancel_scheduled_messages_for_subscriber(bot_id: str, subscriber_id: int):
+    async def cancel_scheduled_messages_for_subscriber(bot_id: str, subscriber_id: int, session: Optional[AsyncSession] = None):
         """Cancel all pending messages for subscriber"""
-        from database.models import ScheduledMessage
-        
-        async with get_db_session() as session:
+        async with _session(session) as session:
             result = await session.execute(
                 update(ScheduledMessage)
                 .where(
@@ -580,7 +865,6 @@ class BroadcastManager:
                     updated_at=datetime.now()
                 )
             )
-            await session.commit()
             
             cancelled_count = result.rowcount
             
@@ -596,70 +880,78 @@ class BroadcastManager:
     @staticmethod
     async def get_broadcast_analytics(bot_id: str, days: int = 30) -> Dict[str, Any]:
         """Get comprehensive broadcast analytics"""
-        from database.models import (
-            BroadcastSequence, BroadcastMessage, ScheduledMessage, 
-            BotSubscriber, MessageButton
-        )
-        
         start_date = datetime.now() - timedelta(days=days)
         
-        async with get_db_session() as session:
-            # Get sequence info
-            sequence_result = await session.execute(
-                select(BroadcastSequence).where(BroadcastSequence.bot_id == bot_id)
+        # All figures are scalar subqueries around the sequence row, so the
+        # whole report is fetched in a single round trip
+        messages_count = (
+            select(func.count(BroadcastMessage.id))
+            .where(BroadcastMessage.sequence_id == BroadcastSequence.id)
+            .scalar_subquery()
+        )
+        active_messages_count = (
+            select(func.count(BroadcastMessage.id))
+            .where(
+                BroadcastMessage.sequence_id == BroadcastSequence.id,
+                BroadcastMessage.is_active == True
             )
-            sequence = sequence_result.scalar_one_or_none()
-            
-            if not sequence:
-                return {'error': 'No broadcast sequence found'}
-            
-            # Messages count
-            messages_result = await session.execute(
-                select(func.count(BroadcastMessage.id))
-                .where(BroadcastMessage.sequence_id == sequence.id)
+            .scalar_subquery()
+        )
+        messages_with_buttons = (
+            select(func.count(func.distinct(MessageButton.message_id)))
+            .join(BroadcastMessage, MessageButton.message_id == BroadcastMessage.id)
+            .where(BroadcastMessage.sequence_id == BroadcastSequence.id)
+            .scalar_subquery()
+        )
+        funnel_subscribers = (
+            select(func.count(BotSubscriber.id))
+            .where(
+                BotSubscriber.bot_id == bot_id,
+                BotSubscriber.funnel_enabled == True
             )
-            messages_count = messages_result.scalar() or 0
-            
-            # Active messages count
-            active_messages_result = await session.execute(
-                select(func.count(BroadcastMessage.id))
-                .where(
-                    BroadcastMessage.sequence_id == sequence.id,
-                    BroadcastMessage.is_active == True
-                )
+            .scalar_subquery()
+        )
+        scheduled_by_status = (
+            select(
+                ScheduledMessage.status,
+                func.count(ScheduledMessage.id).label('count')
+            ).where(
+                ScheduledMessage.bot_id == bot_id,
+                ScheduledMessage.created_at >= start_date
             )
-            active_messages_count = active_messages_result.scalar() or 0
-            
-            # Scheduled messages stats
-            scheduled_stats_result = await session.execute(
+            .group_by(ScheduledMessage.status)
+            .subquery()
+        )
+        scheduled_stats = select(
+            func.jsonb_object_agg(scheduled_by_status.c.status, scheduled_by_status.c.count, type_=JSONB)
+        ).scalar_subquery()
+        
+        async with get_db_session() as session:
+            result = await session.execute(
                 select(
-                    ScheduledMessage.status,
-                    func.count(ScheduledMessage.id).label('count')
-                ).where(
-                    ScheduledMessage.bot_id == bot_id,
-                    ScheduledMessage.created_at >= start_date
-                )
-                .group_by(ScheduledMessage.status)
+                    BroadcastSequence.id,
+                    BroadcastSequence.is_enabled,
+                    BroadcastSequence.created_at,
+                    BroadcastSequence.updated_at,
+                    messages_count.label('messages_count'),
+                    active_messages_count.label('active_messages_count'),
+                    messages_with_buttons.label('messages_with_buttons'),
+                    funnel_subscribers.label('funnel_subscribers'),
+                    scheduled_stats.label('scheduled_stats')
+                ).where(BroadcastSequence.bot_id == bot_id)
             )
-            scheduled_stats = {row.status: row.count for row in scheduled_stats_result.fetchall()}
+            sequence = result.first()
             
-            # Subscribers with funnel enabled
-            funnel_subscribers_result = await session.execute(
-                select(func.count(BotSubscriber.id))
-                .where(
-                    BotSubscriber.bot_id == bot_id,
-                    BotSubscriber.funnel_enabled == True
-                )
-            )
-            funnel_subscribers = funnel_subscribers_result.scalar() or 0
+            if not sequence:
+                return {'error': 'No broadcast sequence found'}
             
-            # Messages with buttons
-            messages_with_buttons_result = await session.execute(
-                select(func.count(func.distinct(MessageButton.message_id)))
-                .join(BroadcastMessage, MessageButton.message_id == BroadcastMessage.id)
-                .where(BroadcastMessage.sequence_id == sequence.id)
-            )
-            messages_with_buttons = messages_with_buttons_result.scalar() or 0
+            messages_count = sequence.messages_count or 0
+            active_messages_count = sequence.active_messages_count or 0
+            messages_with_buttons = sequence.messages_with_buttons or 0
+            funnel_subscribers = sequence.funnel_subscribers or 0
+            scheduled_stats = sequence.scheduled_stats or {}
+            scheduled_total = sum(scheduled_stats.values())
+            denom = scheduled_total or 1
             
             return {
                 'sequence_info': {
@@ -679,198 +971,167 @@ class BroadcastManager:
                     'sent': scheduled_stats.get('sent', 0),
                     'failed': scheduled_stats.get('failed', 0),
                     'cancelled': scheduled_stats.get('cancelled', 0),
-                    'total': sum(scheduled_stats.values())
+                    'total': scheduled_total
                 },
                 'subscribers': {
                     'funnel_enabled': funnel_subscribers
                 },
                 'performance': {
-                    'delivery_rate': round(
-                        (scheduled_stats.get('sent', 0) / max(sum(scheduled_stats.values()), 1)) * 100,
-                        2
-                    ),
-                    'failure_rate': round(
-                        (scheduled_stats.get('failed', 0) / max(sum(scheduled_stats.values()), 1)) * 100,
-                        2
-                    )
+                    'delivery_rate': round(scheduled_stats.get('sent', 0) * 100 / denom, 2),
+                    'failure_rate': round(scheduled_stats.get('failed', 0) * 100 / denom, 2)
                 }
             }
     
     @staticmethod
     async def get_message_performance_stats(message_id: int) -> Dict[str, Any]:
         """Get performance statistics for specific message"""
-        from database.models import ScheduledMessage, BroadcastMessage
-        
         async with get_db_session() as session:
-            # Get message info
-            message_result = await session.execute(
-                select(BroadcastMessage).where(BroadcastMessage.id == message_id)
-            )
-            message = message_result.scalar_one_or_none()
+            # Message info, delivery counts and rates in one aggregate row
+            row = (await session.execute(
+                _GET_MESSAGE_PERFORMANCE, {"message_id": message_id}
+            )).first()
             
-            if not message:
+            if row is None:
                 return {'error': 'Message not found'}
             
-            # Get delivery stats
-            delivery_stats_result = await session.execute(
-                select(
-                    ScheduledMessage.status,
-                    func.count(ScheduledMessage.id).label('count')
-                ).where(ScheduledMessage.message_id == message_id)
-                .group_by(ScheduledMessage.status)
-            )
-            delivery_stats = {row.status: row.count for row in delivery_stats_result.fetchall()}
+            info_end = len(_MESSAGE_INFO_KEYS)
+            counts_end = info_end + len(_SCHEDULED_STATUSES)
             
-            # Get timing stats
-            timing_stats_result = await session.execute(
+            # Get timing stats as a plain (avg_delay, first_sent, last_sent) tuple
+            avg_delay_seconds, first_sent, last_sent = (await session.execute(
                 select(
-                    func.avg(
+                    func.coalesce(func.avg(
                         func.extract('epoch', ScheduledMessage.sent_at - ScheduledMessage.scheduled_at)
-                    ).label('avg_delay_seconds'),
-                    func.min(ScheduledMessage.sent_at).label('first_sent'),
-                    func.max(ScheduledMessage.sent_at).label('last_sent')
+                    ), 0),
+                    func.min(ScheduledMessage.sent_at),
+                    func.max(ScheduledMessage.sent_at)
                 ).where(
                     ScheduledMessage.message_id == message_id,
                     ScheduledMessage.status == 'sent'
                 )
-            )
-            timing_stats = timing_stats_result.first()
-            
-            total_scheduled = sum(delivery_stats.values())
+            )).tuples().one()
             
             return {
-                'message_info': {
-                    'id': message.id,
-                    'message_number': message.message_number,
-                    'delay_hours': float(message.delay_hours),
-                    'is_active': message.is_active,
-                    'has_media': bool(message.media_url or message.media_file_id)
-                },
-                'delivery_stats': delivery_stats,
-                'performance': {
-                    'total_scheduled': total_scheduled,
-                    'delivery_rate': round(
-                        (delivery_stats.get('sent', 0) / max(total_scheduled, 1)) * 100,
-                        2
-                    ),
-                    'failure_rate': round(
-                        (delivery_stats.get('failed', 0) / max(total_scheduled, 1)) * 100,
-                        2
-                    ),
-                    'pending_rate': round(
-                        (delivery_stats.get('pending', 0) / max(total_scheduled, 1)) * 100,
-                        2
-                    )
+                'message_info': dict(zip(_MESSAGE_INFO_KEYS, row[:info_end])),
+                'delivery_stats': {
+                    status: count
+                    for status, count in zip(_SCHEDULED_STATUSES, row[info_end:counts_end])
+                    if count
                 },
+                'performance': dict(zip(_PERFORMANCE_KEYS, row[counts_end:])),
                 'timing': {
-                    'avg_delay_seconds': float(timing_stats.avg_delay_seconds or 0),
-                    'first_sent': timing_stats.first_sent,
-                    'last_sent': timing_stats.last_sent
+                    'avg_delay_seconds': float(avg_delay_seconds),
+                    'first_sent': first_sent,
+                    'last_sent': last_sent
                 }
             }
     
     # ===== BROADCAST MAINTENANCE =====
     
     @staticmethod
-    async def cleanup_old_scheduled_messages(days: int = 30) -> int:
-        """Clean up old scheduled messages"""
-        from database.models import ScheduledMessage
+    async def cleanup_old_scheduled_messages(days: int = 30, batch_size: int = 10000) -> int:
+        """Clean up old scheduled messages
         
+        Rows are deleted in committed batches so locks and WAL per
+        transaction stay bounded; SKIP LOCKED leaves rows in use alone.
+        """
         cutoff_date = datetime.now() - timedelta(days=days)
+        count = 0
         
         async with get_db_session() as session:
-            # Count messages to be deleted
-            count_result = await session.execute(
-                select(func.count(ScheduledMessage.id))
-                .where(
-                    ScheduledMessage.status.in_(['sent', 'failed', 'cancelled']),
-                    ScheduledMessage.updated_at < cutoff_date
-                )
-            )
-            count = count_result.scalar() or 0
-            
-            if count > 0:
-                # Delete old messages
-                await session.execute(
-                    delete(ScheduledMessage)
-                    .where(
-                        ScheduledMessage.status.in_(['sent', 'failed', 'cancelled']),
-                        ScheduledMessage.updated_at < cutoff_date
-                    )
+            while True:
+                result = await session.execute(
+                    _CLEANUP_SCHEDULED_BATCH,
+                    {"cutoff": cutoff_date, "batch_size": batch_size}
                 )
                 await session.commit()
                 
-                logger.info("🧹 Old scheduled messages cleaned up", 
-                           days=days,
-                           deleted_count=count)
-            
-            return count
+                count += result.rowcount
+                if result.rowcount < batch_size:
+                    break
+        
+        if count:
+            logger.info("🧹 Old scheduled messages cleaned up", 
+                       days=days,
+                       deleted_count=count)
+        
+        return count
     
     @staticmethod
-    async def get_broadcast_summary() -> Dict[str, Any]:
-        """Get overall broadcast system summary"""
-        from database.models import (
-            BroadcastSequence, BroadcastMessage, ScheduledMessage, MessageButton
-        )
+    async def refresh_broadcast_stats_daily(days: int = 30) -> int:
+        """Recompute broadcast_stats_daily buckets for the last days, return bucket count
+        
+        Old rows keep changing status (pending -> sent) so the whole window is
+        rebuilt; deleting first drops statuses that no longer have rows.
+        """
+        since = (datetime.now() - timedelta(days=days)).date()
+        day = cast(ScheduledMessage.created_at, Date)
         
         async with get_db_session() as session:
-            # Sequences stats
-            sequences_result = await session.execute(
-                select(
-                    func.count(BroadcastSequence.id).label('total'),
-                    func.sum(func.cast(BroadcastSequence.is_enabled, func.Integer)).label('enabled')
-                )
+            await session.execute(
+                delete(BroadcastStatsDaily).where(BroadcastStatsDaily.day >= since)
             )
-            sequences_stats = sequences_result.first()
-            
-            # Messages stats
-            messages_result = await session.execute(
-                select(
-                    func.count(BroadcastMessage.id).label('total'),
-                    func.sum(func.cast(BroadcastMessage.is_active, func.Integer)).label('active')
+            result = await session.execute(
+                insert(BroadcastStatsDaily).from_select(
+                    ["day", "status", "count"],
+                    select(day, ScheduledMessage.status, func.count(ScheduledMessage.id))
+                    .where(ScheduledMessage.created_at >= since)
+                    .group_by(day, ScheduledMessage.status)
                 )
             )
-            messages_stats = messages_result.first()
-            
-            # Scheduled messages stats (last 30 days)
-            thirty_days_ago = datetime.now() - timedelta(days=30)
-            scheduled_result = await session.execute(
-                select(
-                    ScheduledMessage.status,
-                    func.count(ScheduledMessage.id).label('count')
-                ).where(ScheduledMessage.created_at >= thirty_days_ago)
-                .group_by(ScheduledMessage.status)
-            )
-            scheduled_stats = {row.status: row.count for row in scheduled_result.fetchall()}
+        
+        # After commit, or a concurrent summary load could re-cache old buckets
+        BroadcastManager.invalidate_summary_cache()
+        
+        logger.info("📊 Broadcast daily stats refreshed", 
+                   days=days,
+                   buckets=result.rowcount)
+        
+        return result.rowcount
+    
+    @staticmethod
+    async def get_broadcast_summary() -> Dict[str, Any]:
+        """Get overall broadcast system summary (cached for 30 seconds)"""
+        return await _broadcast_summary_cache.get_or_load(
+            'broadcast_summary', BroadcastManager._load_broadcast_summary
+        )
+    
+    @staticmethod
+    async def _load_broadcast_summary() -> Dict[str, Any]:
+        """Compute overall broadcast system summary"""
+        async with get_db_session() as session:
+            # Sequences, messages and buttons stats
+            connection = await session.connection()
+            counts = (await connection.exec_driver_sql(_SUMMARY_COUNTS)).one()
             
-            # Buttons stats
-            buttons_result = await session.execute(
-                select(func.count(MessageButton.id))
-            )
-            buttons_count = buttons_result.scalar() or 0
+            # Scheduled messages stats (last 30 days) from the daily rollup
+            thirty_days_ago = (datetime.now() - timedelta(days=30)).date()
+            scheduled_rows = (await session.execute(
+                _status_rollup(
+                    BroadcastStatsDaily.status,
+                    func.sum(BroadcastStatsDaily.count),
+                    BroadcastStatsDaily.day >= thirty_days_ago
+                )
+            )).all()
+            scheduled_stats = {row.status: row.count for row in scheduled_rows}
+            scheduled_rates = {row.status: float(row.pct) for row in scheduled_rows}
             
             return {
                 'sequences': {
-                    'total': sequences_stats.total or 0,
-                    'enabled': sequences_stats.enabled or 0,
-                    'disabled': (sequences_stats.total or 0) - (sequences_stats.enabled or 0)
+                    'total': counts.sequences_total,
+                    'enabled': counts.sequences_enabled,
+                    'disabled': counts.sequences_total - counts.sequences_enabled
                 },
                 'messages': {
-                    'total': messages_stats.total or 0,
-                    'active': messages_stats.active or 0,
-                    'inactive': (messages_stats.total or 0) - (messages_stats.active or 0),
-                    'total_buttons': buttons_count
+                    'total': counts.messages_total,
+                    'active': counts.messages_active,
+                    'inactive': counts.messages_total - counts.messages_active,
+                    'total_buttons': counts.buttons_total
                 },
                 'scheduled_30d': scheduled_stats,
                 'performance_30d': {
-                    'total_scheduled': sum(scheduled_stats.values()),
-                    'delivery_rate': round(
-                        (scheduled_stats.get('sent', 0) / max(sum(scheduled_stats.values()), 1)) * 100,
-                        2
-                    ),
-                    'failure_rate': round(
-                        (scheduled_stats.get('failed', 0) / max(sum(scheduled_stats.values()), 1)) * 100,
-                        2
-                    )
+                    'total_scheduled': int(scheduled_rows[0].total) if scheduled_rows else 0,
+                    'delivery_rate': scheduled_rates.get('sent', 0.0),
+                    'failure_rate': scheduled_rates.get('failed', 0.0)
                 }
             }
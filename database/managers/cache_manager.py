@@ -9,15 +9,86 @@ Responsibilities:
 - Bulk cache operations and maintenance
 """
 
+import asyncio
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any, Set
-from sqlalchemy import select, update, func
+from typing import List, Dict, Any, Callable, Tuple
+from sqlalchemy import select, func
+from sqlalchemy.orm import selectinload
 import structlog
 
+from config import settings
+from database.models import User, UserBot
 from ..connection import get_db_session
+from ..ttl_cache import AsyncTTLCache
 
 logger = structlog.get_logger()
 
+# Monitoring snapshots, recomputed at most every CACHE_STATS_TTL /
+# CACHE_STALE_REPORT_TTL seconds per process (stale report keyed by hours)
+_cache_statistics_cache = AsyncTTLCache(ttl=settings.cache_stats_ttl)
+_stale_report_cache = AsyncTTLCache(ttl=settings.cache_stale_report_ttl)
+
+# Active bot ids are streamed and refreshed in chunks of this size,
+# keeping memory and each IN (...) list bounded
+_ACTIVE_BOTS_BATCH_SIZE = 500
+
+# Health recommendations depend only on the score band and four threshold
+# flags, so every combination is built once at import
+_HEALTH_STALE_BOTS = 1 << 3
+_HEALTH_STALE_USERS = 1 << 2
+_HEALTH_BOT_ACTIVITY = 1 << 1
+_HEALTH_USER_ACTIVITY = 1 << 0
+
+
+def _health_band(health_score: float) -> int:
+    """Score band: 0 critical (<40), 1 fair (<60), 2 good (<80), 3 excellent"""
+    if health_score < 40:
+        return 0
+    if health_score < 60:
+        return 1
+    if health_score < 80:
+        return 2
+    return 3
+
+
+def _build_health_recommendations() -> Dict[int, Tuple[str, ...]]:
+    """Recommendations for every (band << 4 | flags) key"""
+    table = {}
+    
+    for band in range(4):
+        for flags in range(16):
+            recommendations = []
+            
+            if band == 0:
+                recommendations.append("Critical: Consider emergency cache clear and optimization")
+            if flags & _HEALTH_STALE_BOTS:
+                recommendations.append("High stale bot percentage: Schedule more frequent bot cache refresh")
+            if flags & _HEALTH_STALE_USERS:
+                recommendations.append("High stale user percentage: Schedule more frequent user cache refresh")
+            if flags & _HEALTH_BOT_ACTIVITY:
+                recommendations.append("Very high bot activity: Consider cache optimization or batching")
+            if flags & _HEALTH_USER_ACTIVITY:
+                recommendations.append("High user activity: Monitor cache performance closely")
+            if band == 1:
+                recommendations.append("Fair cache health: Schedule routine maintenance")
+            if band == 3:
+                recommendations.append("Excellent cache health: Current strategy is working well")
+            if not recommendations:
+                recommendations.append("Cache health is acceptable: Continue current practices")
+            
+            table[(band << 4) | flags] = tuple(recommendations)
+    
+    return table
+
+
+_HEALTH_RECOMMENDATIONS = _build_health_recommendations()
+
+
+async def _run_query(stmt, fetch: Callable[[Any], Any]) -> Any:
+    """Execute stmt in its own session so independent queries can run concurrently"""
+    async with get_db_session() as session:
+        return fetch(await session.execute(stmt))
+
 
 class CacheManager:
     """Manager for cache operations and data refresh"""
@@ -27,10 +98,8 @@ class CacheManager:
     @staticmethod
     async def refresh_bot_data(bot_id: str):
         """Принудительное обновление данных бота из БД"""
-        from database.models import UserBot
-        
         async with get_db_session() as session:
-            # Получаем свежие данные с populate_existing=True
+            # populate_existing=True перезагружает состояние без отдельного refresh
             result = await session.execute(
                 select(UserBot)
                 .where(UserBot.bot_id == bot_id)
@@ -39,8 +108,6 @@ class CacheManager:
             bot = result.scalar_one_or_none()
             
             if bot:
-                # Принудительно обновляем объект
-                await session.refresh(bot)
                 logger.info("✅ Bot data refreshed from database", bot_id=bot_id)
                 return bot
             else:
@@ -49,18 +116,17 @@ class CacheManager:
     
     @staticmethod
     async def expire_bot_cache(bot_id: str):
-        """Очистка кэша для конкретного бота"""
-        from database.models import UserBot
+        """Очистка кэша для конкретного бота
         
+        Сессии живут одну операцию, ORM-состояния между вызовами нет;
+        метод сообщает, существует ли бот (SELECT только bot_id).
+        """
         async with get_db_session() as session:
-            # Получаем объект и помечаем как expired
             result = await session.execute(
-                select(UserBot).where(UserBot.bot_id == bot_id)
+                select(UserBot.bot_id).where(UserBot.bot_id == bot_id)
             )
-            bot = result.scalar_one_or_none()
             
-            if bot:
-                session.expire(bot)
+            if result.scalar_one_or_none():
                 logger.info("✅ Bot cache expired", bot_id=bot_id)
                 return True
             else:
@@ -70,8 +136,6 @@ class CacheManager:
     @staticmethod 
     async def get_fresh_bot_data(bot_id: str):
         """Получение всегда свежих данных бота (без кэша)"""
-        from database.models import UserBot
-        
         async with get_db_session() as session:
             # Всегда получаем свежие данные из БД
             result = await session.execute(
@@ -91,75 +155,54 @@ class CacheManager:
     @staticmethod
     async def refresh_multiple_bots(bot_ids: List[str]) -> Dict[str, bool]:
         """Обновление данных нескольких ботов"""
-        from database.models import UserBot
-        
-        results = {}
-        
         if not bot_ids:
-            return results
+            return {}
         
         async with get_db_session() as session:
-            # Получаем все боты одним запросом
-            result = await session.execute(
-                select(UserBot)
-                .where(UserBot.bot_id.in_(bot_ids))
-                .execution_options(populate_existing=True)
-            )
-            bots = result.scalars().all()
-            
-            # Обновляем каждого бота
-            for bot in bots:
-                try:
-                    await session.refresh(bot)
-                    results[bot.bot_id] = True
-                    logger.debug("✅ Bot refreshed", bot_id=bot.bot_id)
-                except Exception as e:
-                    results[bot.bot_id] = False
-                    logger.error("❌ Failed to refresh bot", 
-                                bot_id=bot.bot_id,
-                                error=str(e))
-            
-            # Отмечаем отсутствующие боты
-            found_bot_ids = {bot.bot_id for bot in bots}
-            for bot_id in bot_ids:
-                if bot_id not in found_bot_ids:
-                    results[bot_id] = False
-                    logger.warning("❌ Bot not found for refresh", bot_id=bot_id)
+            results = await CacheManager._refresh_bot_batch(session, bot_ids)
         
+        successful = sum(results.values())
         logger.info("🔄 Multiple bots refresh completed", 
                    total_requested=len(bot_ids),
-                   successful=sum(results.values()),
-                   failed=len(results) - sum(results.values()))
+                   successful=successful,
+                   failed=len(results) - successful)
+        
+        return results
+    
+    @staticmethod
+    async def _refresh_bot_batch(session, bot_ids: List[str]) -> Dict[str, bool]:
+        """Reload one batch of bots in the given session"""
+        # Получаем все боты батча одним запросом;
+        # populate_existing перезагружает состояние каждого бота
+        result = await session.execute(
+            select(UserBot)
+            .where(UserBot.bot_id.in_(bot_ids))
+            .execution_options(populate_existing=True)
+        )
+        results = {bot.bot_id: True for bot in result.scalars().all()}
+        
+        # Отмечаем отсутствующие боты
+        for bot_id in bot_ids:
+            if bot_id not in results:
+                results[bot_id] = False
+                logger.warning("❌ Bot not found for refresh", bot_id=bot_id)
         
         return results
     
     @staticmethod
     async def expire_multiple_bot_caches(bot_ids: List[str]) -> int:
         """Очистка кэша нескольких ботов"""
-        from database.models import UserBot
-        
         if not bot_ids:
             return 0
         
-        expired_count = 0
-        
         async with get_db_session() as session:
-            # Получаем все боты одним запросом
+            # Считаем существующие боты, не загружая строки
             result = await session.execute(
-                select(UserBot).where(UserBot.bot_id.in_(bot_ids))
+                select(func.count())
+                .select_from(UserBot)
+                .where(UserBot.bot_id.in_(bot_ids))
             )
-            bots = result.scalars().all()
-            
-            # Помечаем каждого как expired
-            for bot in bots:
-                try:
-                    session.expire(bot)
-                    expired_count += 1
-                    logger.debug("✅ Bot cache expired", bot_id=bot.bot_id)
-                except Exception as e:
-                    logger.error("❌ Failed to expire bot cache", 
-                                bot_id=bot.bot_id,
-                                error=str(e))
+            expired_count = result.scalar_one()
         
         logger.info("🗑️ Multiple bot caches expired", 
                    expired_count=expired_count,
@@ -172,10 +215,8 @@ class CacheManager:
     @staticmethod
     async def refresh_user_data(user_id: int):
         """Принудительное обновление данных пользователя из БД"""
-        from database.models import User
-        
         async with get_db_session() as session:
-            # Получаем свежие данные с populate_existing=True
+            # populate_existing=True перезагружает состояние без отдельного refresh
             result = await session.execute(
                 select(User)
                 .where(User.id == user_id)
@@ -184,8 +225,6 @@ class CacheManager:
             user = result.scalar_one_or_none()
             
             if user:
-                # Принудительно обновляем объект
-                await session.refresh(user)
                 logger.info("✅ User data refreshed from database", user_id=user_id)
                 return user
             else:
@@ -194,18 +233,16 @@ class CacheManager:
     
     @staticmethod
     async def expire_user_cache(user_id: int):
-        """Очистка кэша для конкретного пользователя"""
-        from database.models import User
+        """Очистка кэша для конкретного пользователя
         
+        Как и expire_bot_cache, сообщает, существует ли пользователь.
+        """
         async with get_db_session() as session:
-            # Получаем объект и помечаем как expired
             result = await session.execute(
-                select(User).where(User.id == user_id)
+                select(User.id).where(User.id == user_id)
             )
-            user = result.scalar_one_or_none()
             
-            if user:
-                session.expire(user)
+            if result.scalar_one_or_none() is not None:
                 logger.info("✅ User cache expired", user_id=user_id)
                 return True
             else:
@@ -215,8 +252,6 @@ class CacheManager:
     @staticmethod
     async def get_fresh_user_data(user_id: int):
         """Получение всегда свежих данных пользователя (без кэша)"""
-        from database.models import User
-        
         async with get_db_session() as session:
             # Всегда получаем свежие данные из БД
             result = await session.execute(
@@ -234,30 +269,83 @@ class CacheManager:
             return user
     
     @staticmethod
-    async def refresh_user_with_bots(user_id: int) -> Dict[str, Any]:
-        """Обновление данных пользователя вместе со всеми его ботами"""
-        # Обновляем пользователя
-        user = await CacheManager.refresh_user_data(user_id)
+    async def refresh_multiple_users(user_ids: List[int]) -> Dict[int, bool]:
+        """Обновление данных нескольких пользователей"""
+        results = {}
         
-        if not user:
-            return {'user': None, 'bots': {}}
+        if not user_ids:
+            return results
         
-        # Получаем ID всех ботов пользователя
-        from database.models import UserBot
+        async with get_db_session() as session:
+            # Получаем всех пользователей одним запросом
+            result = await session.execute(
+                select(User)
+                .where(User.id.in_(user_ids))
+                .execution_options(populate_existing=True)
+            )
+            
+            for user in result.scalars().all():
+                results[user.id] = True
+        
+        successful = len(results)
+        
+        # Отмечаем отсутствующих пользователей
+        for user_id in user_ids:
+            if user_id not in results:
+                results[user_id] = False
+                logger.warning("❌ User not found for refresh", user_id=user_id)
+        
+        logger.info("🔄 Multiple users refresh completed", 
+                   total_requested=len(user_ids),
+                   successful=successful,
+                   failed=len(results) - successful)
+        
+        return results
+    
+    @staticmethod
+    async def expire_multiple_user_caches(user_ids: List[int]) -> int:
+        """Очистка кэша нескольких пользователей"""
+        if not user_ids:
+            return 0
         
         async with get_db_session() as session:
-            bots_result = await session.execute(
-                select(UserBot.bot_id).where(UserBot.user_id == user_id)
+            # Считаем существующих пользователей, не загружая строки
+            result = await session.execute(
+                select(func.count())
+                .select_from(User)
+                .where(User.id.in_(user_ids))
             )
-            bot_ids = [row.bot_id for row in bots_result.fetchall()]
+            expired_count = result.scalar_one()
+        
+        logger.info("🗑️ Multiple user caches expired", 
+                   expired_count=expired_count,
+                   total_requested=len(user_ids))
         
-        # Обновляем всех ботов
-        bots_refresh_results = await CacheManager.refresh_multiple_bots(bot_ids)
+        return expired_count
+    
+    @staticmethod
+    async def refresh_user_with_bots(user_id: int) -> Dict[str, Any]:
+        """Обновление данных пользователя вместе со всеми его ботами"""
+        async with get_db_session() as session:
+            # Пользователь и его боты: основной SELECT + один selectin-запрос
+            result = await session.execute(
+                select(User)
+                .where(User.id == user_id)
+                .options(selectinload(User.bots))
+                .execution_options(populate_existing=True)
+            )
+            user = result.scalar_one_or_none()
+            
+            if not user:
+                logger.warning("❌ User not found for refresh", user_id=user_id)
+                return {'user': None, 'bots': {}}
+            
+            bots_refresh_results = {bot.bot_id: True for bot in user.bots}
         
         logger.info("🔄 User with bots refreshed", 
                    user_id=user_id,
-                   bots_count=len(bot_ids),
-                   bots_refreshed=sum(bots_refresh_results.values()))
+                   bots_count=len(bots_refresh_results),
+                   bots_refreshed=len(bots_refresh_results))
         
         return {
             'user': user,
@@ -294,10 +382,8 @@ class CacheManager:
     @staticmethod
     async def expire_openai_agent_cache(agent_id: str):
         """Очистка кэша OpenAI агента по agent_id"""
-        from database.models import UserBot
-        
         async with get_db_session() as session:
-            # Находим бота по agent_id
+            # Находим бота по agent_id (только bot_id, по частичному индексу)
             result = await session.execute(
                 select(UserBot.bot_id)
                 .where(UserBot.openai_agent_id == agent_id)
@@ -305,7 +391,8 @@ class CacheManager:
             bot_id = result.scalar_one_or_none()
             
             if bot_id:
-                return await CacheManager.expire_bot_cache(bot_id)
+                logger.info("✅ Bot cache expired", bot_id=bot_id, agent_id=agent_id)
+                return True
             else:
                 logger.warning("❌ Bot not found for OpenAI agent", agent_id=agent_id)
                 return False
@@ -319,13 +406,11 @@ class CacheManager:
         user_expired = await CacheManager.expire_user_cache(user_id)
         
         # Получаем ID всех ботов пользователя
-        from database.models import UserBot
-        
         async with get_db_session() as session:
             bots_result = await session.execute(
                 select(UserBot.bot_id).where(UserBot.user_id == user_id)
             )
-            bot_ids = [row.bot_id for row in bots_result.fetchall()]
+            bot_ids = bots_result.scalars().all()
         
         # Очищаем кэш всех ботов
         bots_expired = await CacheManager.expire_multiple_bot_caches(bot_ids)
@@ -345,27 +430,33 @@ class CacheManager:
     @staticmethod
     async def refresh_all_active_bots() -> Dict[str, Any]:
         """Обновление кэша всех активных ботов"""
-        from database.models import UserBot
+        total_bots = 0
+        refreshed = 0
         
-        async with get_db_session() as session:
-            # Получаем ID всех активных ботов
-            result = await session.execute(
+        async with get_db_session() as stream_session, get_db_session() as session:
+            # ID активных ботов читаем серверным курсором батчами
+            active_bot_ids = await stream_session.stream_scalars(
                 select(UserBot.bot_id)
                 .where(UserBot.status == 'active')
+                .execution_options(yield_per=_ACTIVE_BOTS_BATCH_SIZE)
             )
-            active_bot_ids = [row.bot_id for row in result.fetchall()]
+            
+            # Обновляем каждый батч в одной общей сессии
+            async for batch in active_bot_ids.partitions():
+                batch_results = await CacheManager._refresh_bot_batch(session, batch)
+                total_bots += len(batch_results)
+                refreshed += sum(batch_results.values())
+                # Освобождаем identity map, чтобы память не росла с числом ботов
+                session.expunge_all()
         
-        if not active_bot_ids:
+        if not total_bots:
             logger.info("No active bots found for refresh")
             return {'total_bots': 0, 'refreshed': 0, 'failed': 0}
         
-        # Обновляем всех активных ботов
-        refresh_results = await CacheManager.refresh_multiple_bots(active_bot_ids)
-        
         result = {
-            'total_bots': len(active_bot_ids),
-            'refreshed': sum(refresh_results.values()),
-            'failed': len(refresh_results) - sum(refresh_results.values())
+            'total_bots': total_bots,
+            'refreshed': refreshed,
+            'failed': total_bots - refreshed
         }
         
         logger.info("🔄 All active bots refresh completed", **result)
@@ -375,26 +466,22 @@ class CacheManager:
     @staticmethod
     async def expire_all_active_bot_caches() -> int:
         """Очистка кэша всех активных ботов"""
-        from database.models import UserBot
-        
         async with get_db_session() as session:
-            # Получаем ID всех активных ботов
+            # Только число активных ботов, без выгрузки их id
             result = await session.execute(
-                select(UserBot.bot_id)
+                select(func.count())
+                .select_from(UserBot)
                 .where(UserBot.status == 'active')
             )
-            active_bot_ids = [row.bot_id for row in result.fetchall()]
+            expired_count = result.scalar_one()
         
-        if not active_bot_ids:
+        if not expired_count:
             logger.info("No active bots found for cache expiration")
             return 0
         
-        # Очищаем кэш всех активных ботов
-        expired_count = await CacheManager.expire_multiple_bot_caches(active_bot_ids)
-        
         logger.info("🗑️ All active bot caches expired", 
                    expired_count=expired_count,
-                   total_bots=len(active_bot_ids))
+                   total_bots=expired_count)
         
         return expired_count
     
@@ -402,79 +489,74 @@ class CacheManager:
     
     @staticmethod
     async def get_cache_statistics() -> Dict[str, Any]:
-        """Получение статистики кэширования"""
-        from database.models import UserBot, User
-        
-        async with get_db_session() as session:
-            # Статистика ботов
-            bots_stats_result = await session.execute(
-                select(
-                    func.count(UserBot.id).label('total_bots'),
-                    func.sum(func.case([(UserBot.status == 'active', 1)], else_=0)).label('active_bots'),
-                    func.sum(func.case([(UserBot.ai_assistant_enabled == True, 1)], else_=0)).label('ai_enabled_bots'),
-                    func.max(UserBot.updated_at).label('last_bot_update')
-                )
-            )
-            bots_stats = bots_stats_result.first()
-            
-            # Статистика пользователей
-            users_stats_result = await session.execute(
-                select(
-                    func.count(User.id).label('total_users'),
-                    func.sum(func.case([(User.tokens_limit_total.isnot(None), 1)], else_=0)).label('users_with_tokens'),
-                    func.max(User.updated_at).label('last_user_update')
-                )
-            )
-            users_stats = users_stats_result.first()
-            
-            # Статистика обновлений за последний час
-            one_hour_ago = datetime.now() - timedelta(hours=1)
-            
-            recent_updates_result = await session.execute(
+        """Получение статистики кэширования (кэшируется на CACHE_STATS_TTL секунд)"""
+        return await _cache_statistics_cache.get_or_load(
+            'cache_statistics', CacheManager._load_cache_statistics
+        )
+    
+    @staticmethod
+    async def _load_cache_statistics() -> Dict[str, Any]:
+        """Расчет статистики кэширования"""
+        one_hour_ago = datetime.now() - timedelta(hours=1)
+        
+        # Два независимых агрегата (по ботам и по пользователям) выполняем параллельно
+        bots_stats, users_stats = await asyncio.gather(
+            # Статистика ботов, включая обновления за последний час
+            _run_query(
                 select(
-                    func.count(UserBot.id).label('bots_updated_last_hour')
-                ).where(UserBot.updated_at >= one_hour_ago)
-            )
-            recent_bots_updates = recent_updates_result.scalar() or 0
-            
-            recent_user_updates_result = await session.execute(
+                    func.count().label('total_bots'),
+                    func.count().filter(UserBot.status == 'active').label('active_bots'),
+                    func.count().filter(UserBot.ai_assistant_enabled == True).label('ai_enabled_bots'),
+                    func.max(UserBot.updated_at).label('last_bot_update'),
+                    func.count().filter(UserBot.updated_at >= one_hour_ago).label('bots_updated_last_hour')
+                ),
+                lambda result: result.one()
+            ),
+            # Статистика пользователей, включая обновления за последний час
+            _run_query(
                 select(
-                    func.count(User.id).label('users_updated_last_hour')
-                ).where(User.updated_at >= one_hour_ago)
+                    func.count().label('total_users'),
+                    func.count().filter(User.tokens_limit_total.isnot(None)).label('users_with_tokens'),
+                    func.max(User.updated_at).label('last_user_update'),
+                    func.count().filter(User.updated_at >= one_hour_ago).label('users_updated_last_hour')
+                ),
+                lambda result: result.one()
             )
-            recent_user_updates = recent_user_updates_result.scalar() or 0
-            
-            return {
-                'bots': {
-                    'total': int(bots_stats.total_bots or 0),
-                    'active': int(bots_stats.active_bots or 0),
-                    'ai_enabled': int(bots_stats.ai_enabled_bots or 0),
-                    'last_update': bots_stats.last_bot_update,
-                    'updated_last_hour': recent_bots_updates
-                },
-                'users': {
-                    'total': int(users_stats.total_users or 0),
-                    'with_tokens': int(users_stats.users_with_tokens or 0),
-                    'last_update': users_stats.last_user_update,
-                    'updated_last_hour': recent_user_updates
-                },
-                'cache_health': {
-                    'bot_activity_rate': round(
-                        (recent_bots_updates / max(bots_stats.total_bots or 1, 1)) * 100,
-                        2
-                    ),
-                    'user_activity_rate': round(
-                        (recent_user_updates / max(users_stats.total_users or 1, 1)) * 100,
-                        2
-                    ),
-                    'recommendation': CacheManager._get_cache_recommendation(
-                        recent_bots_updates, 
-                        recent_user_updates,
-                        int(bots_stats.total_bots or 0),
-                        int(users_stats.total_users or 0)
-                    )
-                }
+        )
+        recent_bots_updates = bots_stats.bots_updated_last_hour
+        recent_user_updates = users_stats.users_updated_last_hour
+        
+        return {
+            'bots': {
+                'total': int(bots_stats.total_bots or 0),
+                'active': int(bots_stats.active_bots or 0),
+                'ai_enabled': int(bots_stats.ai_enabled_bots or 0),
+                'last_update': bots_stats.last_bot_update,
+                'updated_last_hour': recent_bots_updates
+            },
+            'users': {
+                'total': int(users_stats.total_users or 0),
+                'with_tokens': int(users_stats.users_with_tokens or 0),
+                'last_update': users_stats.last_user_update,
+                'updated_last_hour': recent_user_updates
+            },
+            'cache_health': {
+                'bot_activity_rate': round(
+                    (recent_bots_updates / max(bots_stats.total_bots or 1, 1)) * 100,
+                    2
+                ),
+                'user_activity_rate': round(
+                    (recent_user_updates / max(users_stats.total_users or 1, 1)) * 100,
+                    2
+                ),
+                'recommendation': CacheManager._get_cache_recommendation(
+                    recent_bots_updates, 
+                    recent_user_updates,
+                    int(bots_stats.total_bots or 0),
+                    int(users_stats.total_users or 0)
+                )
             }
+        }
     
     @staticmethod
     def _get_cache_recommendation(recent_bots: int, recent_users: int, total_bots: int, total_users: int) -> str:
@@ -491,14 +573,22 @@ class CacheManager:
     
     @staticmethod
     async def get_stale_data_report(hours: int = 24) -> Dict[str, Any]:
-        """Отчет о устаревших данных"""
-        from database.models import UserBot, User
-        
-        cutoff_time = datetime.now() - timedelta(hours=hours)
-        
-        async with get_db_session() as session:
+        """Отчет о устаревших данных (кэшируется на CACHE_STALE_REPORT_TTL секунд)"""
+        return await _stale_report_cache.get_or_load(
+            hours, lambda: CacheManager._load_stale_data_report(hours)
+        )
+    
+    @staticmethod
+    async def _load_stale_data_report(hours: int) -> Dict[str, Any]:
+        """Построение отчета о устаревших данных"""
+        # Один момент времени и для отсечки, и для расчета hours_stale
+        now = datetime.now()
+        cutoff_time = now - timedelta(hours=hours)
+        
+        # Независимые выборки выполняем параллельно на разных соединениях
+        stale_bots, stale_users, total_stale_bots, total_stale_users = await asyncio.gather(
             # Устаревшие боты
-            stale_bots_result = await session.execute(
+            _run_query(
                 select(
                     UserBot.bot_id,
                     UserBot.bot_name,
@@ -509,72 +599,70 @@ class CacheManager:
                     UserBot.status == 'active'
                 )
                 .order_by(UserBot.updated_at)
-                .limit(50)
-            )
-            stale_bots = stale_bots_result.fetchall()
-            
+                .limit(50),
+                lambda result: result.fetchall()
+            ),
             # Устаревшие пользователи
-            stale_users_result = await session.execute(
+            _run_query(
                 select(
                     User.id,
                     User.username,
                     User.updated_at
                 ).where(User.updated_at < cutoff_time)
                 .order_by(User.updated_at)
-                .limit(50)
-            )
-            stale_users = stale_users_result.fetchall()
-            
+                .limit(50),
+                lambda result: result.fetchall()
+            ),
             # Общая статистика
-            total_stale_bots_result = await session.execute(
-                select(func.count(UserBot.id))
+            _run_query(
+                select(func.count()).select_from(UserBot)
                 .where(
                     UserBot.updated_at < cutoff_time,
                     UserBot.status == 'active'
-                )
-            )
-            total_stale_bots = total_stale_bots_result.scalar() or 0
-            
-            total_stale_users_result = await session.execute(
-                select(func.count(User.id))
-                .where(User.updated_at < cutoff_time)
+                ),
+                lambda result: result.scalar() or 0
+            ),
+            _run_query(
+                select(func.count()).select_from(User)
+                .where(User.updated_at < cutoff_time),
+                lambda result: result.scalar() or 0
             )
-            total_stale_users = total_stale_users_result.scalar() or 0
-            
-            return {
-                'cutoff_hours': hours,
-                'cutoff_time': cutoff_time,
-                'summary': {
-                    'total_stale_bots': total_stale_bots,
-                    'total_stale_users': total_stale_users,
-                    'needs_refresh': total_stale_bots > 0 or total_stale_users > 0
-                },
-                'stale_bots': [
-                    {
-                        'bot_id': bot.bot_id,
-                        'bot_name': bot.bot_name,
-                        'status': bot.status,
-                        'last_update': bot.updated_at,
-                        'hours_stale': round(
-                            (datetime.now() - bot.updated_at).total_seconds() / 3600,
-                            2
-                        )
-                    }
-                    for bot in stale_bots
-                ],
-                'stale_users': [
-                    {
-                        'user_id': user.id,
-                        'username': user.username,
-                        'last_update': user.updated_at,
-                        'hours_stale': round(
-                            (datetime.now() - user.updated_at).total_seconds() / 3600,
-                            2
-                        )
-                    }
-                    for user in stale_users
-                ]
-            }
+        )
+        
+        return {
+            'cutoff_hours': hours,
+            'cutoff_time': cutoff_time,
+            'summary': {
+                'total_stale_bots': total_stale_bots,
+                'total_stale_users': total_stale_users,
+                'needs_refresh': total_stale_bots > 0 or total_stale_users > 0
+            },
+            'stale_bots': [
+                {
+                    'bot_id': bot.bot_id,
+                    'bot_name': bot.bot_name,
+                    'status': bot.status,
+                    'last_update': bot.updated_at,
+                    'hours_stale': round(
+                        (now - bot.updated_at).total_seconds() / 3600,
+                        2
+                    )
+                }
+                for bot in stale_bots
+            ],
+            'stale_users': [
+                {
+                    'user_id': user.id,
+                    'username': user.username,
+                    'last_update': user.updated_at,
+                    'hours_stale': round(
+                        (now - user.updated_at).total_seconds() / 3600,
+                        2
+                    )
+                }
+                for user in stale_users
+            ]
+        }
     
     # ===== CACHE MAINTENANCE =====
     
@@ -591,9 +679,12 @@ class CacheManager:
             bot['bot_id'] for bot in stale_report['stale_bots'][:max_bots]
         ]
         
-        refresh_results = {}
+        bots_total = 0
+        bots_refreshed = 0
         if stale_bot_ids:
             refresh_results = await CacheManager.refresh_multiple_bots(stale_bot_ids)
+            bots_total = len(refresh_results)
+            bots_refreshed = sum(refresh_results.values())
         
         # Обновляем устаревших пользователей (топ 20)
         stale_user_ids = [
@@ -601,21 +692,21 @@ class CacheManager:
         ]
         
         user_refresh_count = 0
-        for user_id in stale_user_ids:
+        if stale_user_ids:
             try:
-                await CacheManager.refresh_user_data(user_id)
-                user_refresh_count += 1
+                users_refresh_results = await CacheManager.refresh_multiple_users(stale_user_ids)
+                user_refresh_count = sum(users_refresh_results.values())
             except Exception as e:
-                logger.error("Failed to refresh user in scheduled task",
-                           user_id=user_id,
+                logger.error("Failed to refresh users in scheduled task",
+                           users_count=len(stale_user_ids),
                            error=str(e))
         
         result = {
             'stale_data_report': stale_report['summary'],
-            'bots_refreshed': sum(refresh_results.values()) if refresh_results else 0,
-            'bots_failed': len(refresh_results) - sum(refresh_results.values()) if refresh_results else 0,
+            'bots_refreshed': bots_refreshed,
+            'bots_failed': bots_total - bots_refreshed,
             'users_refreshed': user_refresh_count,
-            'total_operations': len(refresh_results) + user_refresh_count if refresh_results else user_refresh_count
+            'total_operations': bots_total + user_refresh_count
         }
         
         logger.info("✅ Scheduled cache refresh completed", **result)
@@ -630,24 +721,14 @@ class CacheManager:
         # Очищаем кэш всех активных ботов
         active_bots_expired = await CacheManager.expire_all_active_bot_caches()
         
-        # Получаем и очищаем кэш пользователей с токенами
-        from database.models import User
-        
+        # Пользователи с токенами: один count(*) без выгрузки id
         async with get_db_session() as session:
             users_result = await session.execute(
-                select(User.id).where(User.tokens_limit_total.isnot(None))
+                select(func.count())
+                .select_from(User)
+                .where(User.tokens_limit_total.isnot(None))
             )
-            token_user_ids = [row.id for row in users_result.fetchall()]
-        
-        users_expired = 0
-        for user_id in token_user_ids:
-            try:
-                if await CacheManager.expire_user_cache(user_id):
-                    users_expired += 1
-            except Exception as e:
-                logger.error("Failed to expire user cache in emergency clear",
-                           user_id=user_id,
-                           error=str(e))
+            users_expired = users_result.scalar_one()
         
         result = {
             'bots_cache_expired': active_bots_expired,
@@ -752,30 +833,15 @@ class CacheManager:
         stale_users: float
     ) -> List[str]:
         """Генерация рекомендаций по улучшению здоровья кэша"""
-        recommendations = []
-        
-        if health_score < 40:
-            recommendations.append("Critical: Consider emergency cache clear and optimization")
+        key = _health_band(health_score) << 4
         
         if stale_bots > 20:
-            recommendations.append("High stale bot percentage: Schedule more frequent bot cache refresh")
-        
+            key |= _HEALTH_STALE_BOTS
         if stale_users > 15:
-            recommendations.append("High stale user percentage: Schedule more frequent user cache refresh")
-        
+            key |= _HEALTH_STALE_USERS
         if bot_activity > 20:
-            recommendations.append("Very high bot activity: Consider cache optimization or batching")
-        
+            key |= _HEALTH_BOT_ACTIVITY
         if user_activity > 10:
-            recommendations.append("High user activity: Monitor cache performance closely")
-        
-        if 40 <= health_score < 60:
-            recommendations.append("Fair cache health: Schedule routine maintenance")
-        
-        if health_score >= 80:
-            recommendations.append("Excellent cache health: Current strategy is working well")
-        
-        if not recommendations:
-            recommendations.append("Cache health is acceptable: Continue current practices")
+            key |= _HEALTH_USER_ACTIVITY
         
-        return recommendations
+        return list(_HEALTH_RECOMMENDATIONS[key])
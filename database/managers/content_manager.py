@@ -24,16 +24,162 @@
 12. 🗑️ ОБНОВЛЕНО: Hard delete по умолчанию - агенты полностью удаляются из БД
 """
 
+import asyncio
+import logging
+import re
 import time
-import json
+import orjson
 import structlog
-from typing import Dict, Any, Optional, List, Union
+from typing import Dict, Any, Optional, List, Tuple, Union
 from datetime import datetime, timedelta
-from sqlalchemy import select, update, func, text
+from sqlalchemy import select, update, func, text, bindparam, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from ..connection import get_db_session
+from ..models import BotAdminChannel, ContentAgent
+from ..ttl_cache import AsyncTTLCache
 
 logger = structlog.get_logger()
+# Underlying stdlib logger for cheap level checks; structlog's stdlib
+# BoundLogger only proxies isEnabledFor once main.py has configured it
+_stdlib_logger = logging.getLogger(__name__)
+
+# Hot-path statements are built once at import instead of on every call.
+# Upserts use Core inserts on the model tables (not the ORM classes), so
+# session.execute() binds the dict params instead of running an ORM bulk insert
+
+# save_channel_info: create or refresh the active channel in one statement
+_channel_insert = pg_insert(BotAdminChannel.__table__).values(
+    bot_id=bindparam('bot_id'),
+    chat_id=bindparam('chat_id'),
+    chat_title=bindparam('chat_title'),
+    chat_username=bindparam('chat_username'),
+    chat_type=bindparam('chat_type'),
+    added_at=func.now(),
+    is_active=True,
+    can_post_messages=True
+)
+_UPSERT_CHANNEL_INFO = _channel_insert.on_conflict_do_update(
+    # infers the partial unique index uq_bot_channel_active
+    index_elements=['bot_id'],
+    index_where=_channel_insert.table.c.is_active == True,
+    set_={
+        'chat_id': _channel_insert.excluded.chat_id,
+        'chat_title': _channel_insert.excluded.chat_title,
+        'chat_username': _channel_insert.excluded.chat_username,
+        'chat_type': _channel_insert.excluded.chat_type,
+        'added_at': func.now()
+    }
+)
+
+# get_channel_info
+_GET_CHANNEL_INFO = text("""
+SELECT chat_id, chat_title, chat_username, chat_type, added_at, last_rerait
+FROM bot_admin_channels 
+WHERE bot_id = :bot_id AND is_active = true
+LIMIT 1
+""")
+
+# save_rewrite_result
+_SAVE_REWRITE_RESULT = text("""
+UPDATE bot_admin_channels 
+SET last_rerait = :rewrite_data
+WHERE bot_id = :bot_id AND is_active = true
+""")
+
+# get_last_rewrite
+_GET_LAST_REWRITE = text("""
+SELECT last_rerait FROM bot_admin_channels 
+WHERE bot_id = :bot_id AND is_active = true
+LIMIT 1
+""")
+
+# create_content_agent: create or refresh the active agent in one statement,
+# xmax = 0 only for a freshly inserted row
+_agent_insert = pg_insert(ContentAgent.__table__).values(
+    bot_id=bindparam('bot_id'),
+    agent_name=bindparam('agent_name'),
+    instructions=bindparam('instructions'),
+    openai_agent_id=bindparam('openai_agent_id'),
+    is_active=True,
+    created_at=func.now(),
+    updated_at=func.now()
+)
+_UPSERT_CONTENT_AGENT = _agent_insert.on_conflict_do_update(
+    # infers the partial unique index uq_content_agent_active
+    index_elements=['bot_id'],
+    index_where=_agent_insert.table.c.is_active == True,
+    set_={
+        'agent_name': _agent_insert.excluded.agent_name,
+        'instructions': _agent_insert.excluded.instructions,
+        'openai_agent_id': _agent_insert.excluded.openai_agent_id,
+        'updated_at': func.now()
+    }
+).returning(
+    _agent_insert.table.c.id, _agent_insert.table.c.bot_id, _agent_insert.table.c.agent_name,
+    _agent_insert.table.c.instructions, _agent_insert.table.c.openai_agent_id,
+    _agent_insert.table.c.is_active, _agent_insert.table.c.created_at, _agent_insert.table.c.updated_at,
+    literal_column('xmax = 0').label('inserted')
+)
+
+# get_content_agent
+_GET_CONTENT_AGENT = text("""
+SELECT id, bot_id, agent_name, instructions, openai_agent_id, 
+       is_active, created_at, updated_at
+FROM content_agents 
+WHERE bot_id = :bot_id AND is_active = true
+ORDER BY created_at DESC
+LIMIT 1
+""")
+
+# get_last_rewrite_slim: по одному statement на число запрошенных ключей
+_slim_rewrite_statements: Dict[int, Any] = {}
+
+
+def _slim_rewrite_statement(keys_count: int):
+    """SELECT last_rerait -> :key_N для keys_count ключей (имена ключей - bind-параметры)"""
+    stmt = _slim_rewrite_statements.get(keys_count)
+    if stmt is None:
+        projection = ", ".join(f"last_rerait -> CAST(:key_{i} AS TEXT)" for i in range(keys_count))
+        stmt = _slim_rewrite_statements[keys_count] = text(f"""
+SELECT {projection} FROM bot_admin_channels 
+WHERE bot_id = :bot_id AND is_active = true AND last_rerait IS NOT NULL
+LIMIT 1
+""")
+    return stmt
+
+
+# bot_id -> активный канал / последний рерайт. Обработчики одного апдейта читают
+# их несколько раз подряд; записи через ContentManager сбрасывают ключ
+_channel_info_cache = AsyncTTLCache(ttl=1, maxsize=10000)
+_last_rewrite_cache = AsyncTTLCache(ttl=5, maxsize=10000)
+
+# bot_id -> активный контент-агент (или None); агенты меняются только через
+# create/update/delete_content_agent, которые сбрасывают ключ
+_content_agent_cache = AsyncTTLCache(ttl=60, maxsize=10000)
+
+# Секции ссылок для AI промпта: ключ в links, заголовок, формат одного элемента
+_LINK_SECTIONS = (
+    ('urls', "📎 Прямые ссылки:", lambda link: f"• {link['url']}"),
+    ('text_links', "🔗 Скрытые гиперссылки:", lambda link: f"• Текст: '{link['text']}' → Ссылка: {link['url']}"),
+    ('emails', "📧 Email адреса:", lambda email: f"• {email}"),
+    ('phone_numbers', "📞 Телефоны:", lambda phone: f"• {phone}"),
+    ('mentions', "👤 Упоминания:", lambda mention: f"• {mention}"),
+)
+
+# calculate_tokens: кириллица и буквы других алфавитов ([^\W\d_] - буква)
+_CYRILLIC_RE = re.compile(r'[\u0400-\u04FF]')
+_OTHER_LETTER_RE = re.compile(r'[^\W\d_\u0400-\u04FF]')
+
+# Поддерживаемые типы медиа в порядке проверки и поля, сохраняемые для каждого
+_MEDIA_FIELDS = (
+    ('photo', ('file_id', 'file_unique_id', 'width', 'height', 'file_size')),
+    ('video', ('file_id', 'file_unique_id', 'width', 'height', 'duration', 'file_size', 'mime_type')),
+    ('animation', ('file_id', 'file_unique_id', 'width', 'height', 'duration', 'file_size', 'mime_type')),
+    ('audio', ('file_id', 'file_unique_id', 'duration', 'performer', 'title', 'file_size', 'mime_type')),
+    ('voice', ('file_id', 'file_unique_id', 'duration', 'file_size', 'mime_type')),
+    ('document', ('file_id', 'file_unique_id', 'file_name', 'file_size', 'mime_type')),
+)
 
 
 class ContentManager:
@@ -118,74 +264,17 @@ class ContentManager:
         try:
             media_info = None
             
-            # Проверяем тип медиа и извлекаем информацию
-            if message.photo:
-                # Берем фото наибольшего размера
-                largest_photo = max(message.photo, key=lambda x: x.width * x.height)
-                media_info = {
-                    'type': 'photo',
-                    'file_id': largest_photo.file_id,
-                    'file_unique_id': largest_photo.file_unique_id,
-                    'width': largest_photo.width,
-                    'height': largest_photo.height,
-                    'file_size': largest_photo.file_size
-                }
-                
-            elif message.video:
-                media_info = {
-                    'type': 'video',
-                    'file_id': message.video.file_id,
-                    'file_unique_id': message.video.file_unique_id,
-                    'width': message.video.width,
-                    'height': message.video.height,
-                    'duration': message.video.duration,
-                    'file_size': message.video.file_size,
-                    'mime_type': message.video.mime_type
-                }
-                
-            elif message.animation:
-                media_info = {
-                    'type': 'animation',
-                    'file_id': message.animation.file_id,
-                    'file_unique_id': message.animation.file_unique_id,
-                    'width': message.animation.width,
-                    'height': message.animation.height,
-                    'duration': message.animation.duration,
-                    'file_size': message.animation.file_size,
-                    'mime_type': message.animation.mime_type
-                }
-                
-            elif message.audio:
-                media_info = {
-                    'type': 'audio',
-                    'file_id': message.audio.file_id,
-                    'file_unique_id': message.audio.file_unique_id,
-                    'duration': message.audio.duration,
-                    'performer': message.audio.performer,
-                    'title': message.audio.title,
-                    'file_size': message.audio.file_size,
-                    'mime_type': message.audio.mime_type
-                }
-                
-            elif message.voice:
-                media_info = {
-                    'type': 'voice',
-                    'file_id': message.voice.file_id,
-                    'file_unique_id': message.voice.file_unique_id,
-                    'duration': message.voice.duration,
-                    'file_size': message.voice.file_size,
-                    'mime_type': message.voice.mime_type
-                }
-                
-            elif message.document:
-                media_info = {
-                    'type': 'document',
-                    'file_id': message.document.file_id,
-                    'file_unique_id': message.document.file_unique_id,
-                    'file_name': message.document.file_name,
-                    'file_size': message.document.file_size,
-                    'mime_type': message.document.mime_type
-                }
+            # Первый найденный тип медиа; photo - список размеров по возрастанию,
+            # поэтому последний элемент и есть наибольшее фото
+            for media_type, fields in _MEDIA_FIELDS:
+                media = getattr(message, media_type, None)
+                if media:
+                    if media_type == 'photo':
+                        media = media[-1]
+                    media_info = {'type': media_type}
+                    for field in fields:
+                        media_info[field] = getattr(media, field, None)
+                    break
             
             if media_info:
                 # Добавляем общую информацию
@@ -215,35 +304,11 @@ class ContentManager:
         """✨ НОВОЕ: Форматирование ссылок для передачи AI агенту"""
         
         try:
-            formatted_parts = []
-            
-            # Обычные ссылки
-            if links.get('urls'):
-                urls_text = "\n".join([f"• {link['url']}" for link in links['urls']])
-                formatted_parts.append(f"📎 Прямые ссылки:\n{urls_text}")
-            
-            # Гиперссылки (текст + ссылка)
-            if links.get('text_links'):
-                text_links = "\n".join([
-                    f"• Текст: '{link['text']}' → Ссылка: {link['url']}" 
-                    for link in links['text_links']
-                ])
-                formatted_parts.append(f"🔗 Скрытые гиперссылки:\n{text_links}")
-            
-            # Email адреса
-            if links.get('emails'):
-                emails_text = "\n".join([f"• {email}" for email in links['emails']])
-                formatted_parts.append(f"📧 Email адреса:\n{emails_text}")
-            
-            # Телефоны
-            if links.get('phone_numbers'):
-                phones_text = "\n".join([f"• {phone}" for phone in links['phone_numbers']])
-                formatted_parts.append(f"📞 Телефоны:\n{phones_text}")
-            
-            # Упоминания
-            if links.get('mentions'):
-                mentions_text = "\n".join([f"• {mention}" for mention in links['mentions']])
-                formatted_parts.append(f"👤 Упоминания:\n{mentions_text}")
+            formatted_parts = [
+                header + "\n" + "\n".join(map(format_item, items))
+                for key, header, format_item in _LINK_SECTIONS
+                if (items := links.get(key))
+            ]
             
             result = "\n\n".join(formatted_parts)
             
@@ -257,289 +322,155 @@ class ContentManager:
             logger.error("💥 Error formatting links for AI", error=str(e))
             return ""
     
-    async def _ensure_tables_exist(self):
-        """✅ Обновленный метод с таблицей каналов"""
-        try:
-            async with get_db_session() as session:
-                # Проверяем существование таблицы content_agents
-                check_agents_query = text("""
-                SELECT EXISTS (
-                    SELECT FROM information_schema.tables 
-                    WHERE table_name = 'content_agents'
-                );
-                """)
-                
-                agents_exists = await session.execute(check_agents_query)
-                
-                if not agents_exists.scalar():
-                    logger.info("🗄️ Creating content_agents table")
-                    await self._create_content_tables(session)
-                
-        except Exception as e:
-            logger.error("💥 Failed to ensure tables exist", error=str(e))
-    
-    async def _create_content_tables(self, session):
-        """✅ Создание таблиц с правильным constraint + таблица каналов"""
-        try:
-            # Таблица контент-агентов с УНИКАЛЬНЫМ CONSTRAINT
-            agents_table = text("""
-            CREATE TABLE IF NOT EXISTS content_agents (
-                id SERIAL PRIMARY KEY,
-                bot_id VARCHAR(255) NOT NULL,
-                agent_name VARCHAR(255) NOT NULL,
-                instructions TEXT NOT NULL,
-                openai_agent_id VARCHAR(255),
-                is_active BOOLEAN DEFAULT true,
-                created_at TIMESTAMP DEFAULT NOW(),
-                updated_at TIMESTAMP DEFAULT NOW(),
-                
-                -- ✅ УНИКАЛЬНЫЙ CONSTRAINT: один активный агент на бота
-                CONSTRAINT unique_bot_content_agent UNIQUE (bot_id, is_active)
-            );
-            """)
-            
-            # Таблица статистики с токеновыми полями  
-            stats_table = text("""
-            CREATE TABLE IF NOT EXISTS content_rewrite_stats (
-                id SERIAL PRIMARY KEY,
-                bot_id VARCHAR(255) NOT NULL,
-                user_id BIGINT,
-                tokens_used INTEGER NOT NULL DEFAULT 0,
-                input_tokens INTEGER DEFAULT 0,
-                output_tokens INTEGER DEFAULT 0,
-                processing_time FLOAT NOT NULL DEFAULT 0,
-                created_at TIMESTAMP DEFAULT NOW()
-            );
-            """)
-            
-            # 📺 НОВАЯ таблица каналов
-            channels_table = text("""
-            CREATE TABLE IF NOT EXISTS bot_admin_channels (
-                id SERIAL PRIMARY KEY,
-                bot_id VARCHAR(255) NOT NULL REFERENCES user_bots(bot_id) ON DELETE CASCADE,
-                chat_id BIGINT NOT NULL,
-                chat_title VARCHAR(255),
-                chat_username VARCHAR(255),
-                chat_type VARCHAR(50) DEFAULT 'channel',
-                added_at TIMESTAMP DEFAULT NOW(),
-                is_active BOOLEAN DEFAULT true,
-                can_post_messages BOOLEAN DEFAULT true,
-                last_rerait JSONB,
-                
-                CONSTRAINT unique_bot_channel UNIQUE (bot_id, is_active)
-            );
-            """)
-            
-            # Индексы для оптимизации
-            indexes = [
-                "CREATE INDEX IF NOT EXISTS idx_content_agents_bot_id ON content_agents(bot_id);",
-                "CREATE INDEX IF NOT EXISTS idx_content_agents_active ON content_agents(bot_id, is_active);", 
-                "CREATE INDEX IF NOT EXISTS idx_content_stats_bot_id ON content_rewrite_stats(bot_id);",
-                "CREATE INDEX IF NOT EXISTS idx_content_stats_created ON content_rewrite_stats(created_at);",
-                "CREATE INDEX IF NOT EXISTS idx_channels_bot_id ON bot_admin_channels(bot_id);",
-                "CREATE INDEX IF NOT EXISTS idx_channels_chat_id ON bot_admin_channels(chat_id);"
-            ]
-            
-            await session.execute(agents_table)
-            await session.execute(stats_table)
-            await session.execute(channels_table)
-            
-            for index_sql in indexes:
-                try:
-                    await session.execute(text(index_sql))
-                except Exception as idx_error:
-                    logger.warning("⚠️ Index creation failed", index=index_sql, error=str(idx_error))
-            
-            await session.commit()
-            
-            logger.info("✅ Content tables created successfully with unique constraint and channels support")
-            
-        except Exception as e:
-            logger.error("💥 Error creating content tables", error=str(e))
-            await session.rollback()
-            raise
-    
     # ===== 📺 НОВОЕ: МЕТОДЫ ДЛЯ РАБОТЫ С КАНАЛАМИ =====
     
     async def save_channel_info(self, bot_id: str, channel_data: Dict[str, Any]) -> bool:
         """Сохранение информации о канале"""
         try:
-            await self._ensure_tables_exist()
-            
             async with get_db_session() as session:
-                # Проверяем существующий канал
-                check_query = text("""
-                SELECT id FROM bot_admin_channels 
-                WHERE bot_id = :bot_id AND is_active = true
-                LIMIT 1
-                """)
-                existing = await session.execute(check_query, {'bot_id': bot_id})
-                
-                if existing.fetchone():
-                    # Обновляем существующий
-                    update_query = text("""
-                    UPDATE bot_admin_channels 
-                    SET chat_id = :chat_id, chat_title = :chat_title, 
-                        chat_username = :chat_username, chat_type = :chat_type,
-                        added_at = NOW()
-                    WHERE bot_id = :bot_id AND is_active = true
-                    """)
-                    await session.execute(update_query, {
-                        'bot_id': bot_id,
-                        'chat_id': channel_data['chat_id'],
-                        'chat_title': channel_data.get('chat_title'),
-                        'chat_username': channel_data.get('chat_username'),
-                        'chat_type': channel_data.get('chat_type', 'channel')
-                    })
-                else:
-                    # Создаем новый
-                    insert_query = text("""
-                    INSERT INTO bot_admin_channels 
-                    (bot_id, chat_id, chat_title, chat_username, chat_type, added_at, is_active, can_post_messages)
-                    VALUES (:bot_id, :chat_id, :chat_title, :chat_username, :chat_type, NOW(), true, true)
-                    """)
-                    await session.execute(insert_query, {
-                        'bot_id': bot_id,
-                        'chat_id': channel_data['chat_id'],
-                        'chat_title': channel_data.get('chat_title'),
-                        'chat_username': channel_data.get('chat_username'),
-                        'chat_type': channel_data.get('chat_type', 'channel')
-                    })
+                # Создаем или обновляем активный канал одним запросом
+                await session.execute(_UPSERT_CHANNEL_INFO, {
+                    'bot_id': bot_id,
+                    'chat_id': channel_data['chat_id'],
+                    'chat_title': channel_data.get('chat_title'),
+                    'chat_username': channel_data.get('chat_username'),
+                    'chat_type': channel_data.get('chat_type', 'channel')
+                })
                 
                 await session.commit()
-                return True
+            
+            # Новый канал начинается без рерайта
+            _channel_info_cache.invalidate(bot_id)
+            _last_rewrite_cache.invalidate(bot_id)
+            return True
                 
         except Exception as e:
             logger.error("💥 Error saving channel info", bot_id=bot_id, error=str(e))
             return False
 
     async def get_channel_info(self, bot_id: str) -> Optional[Dict[str, Any]]:
-        """Получение информации о канале"""
+        """Получение информации о канале (кэшируется на ~1 секунду)"""
+        async def load():
+            async with get_db_session(readonly=True) as session:
+                result = await session.execute(_GET_CHANNEL_INFO, {'bot_id': bot_id})
+                row = result.mappings().first()
+                return dict(row) if row else None
+        
         try:
-            async with get_db_session() as session:
-                query = text("""
-                SELECT chat_id, chat_title, chat_username, chat_type, added_at, last_rerait
-                FROM bot_admin_channels 
-                WHERE bot_id = :bot_id AND is_active = true
-                LIMIT 1
-                """)
-                result = await session.execute(query, {'bot_id': bot_id})
-                row = result.fetchone()
-                
-                if row:
-                    return {
-                        'chat_id': row[0],
-                        'chat_title': row[1],
-                        'chat_username': row[2],
-                        'chat_type': row[3],
-                        'added_at': row[4],
-                        'last_rerait': row[5]
-                    }
-                return None
+            return await _channel_info_cache.get_or_load(bot_id, load)
                 
         except Exception as e:
             logger.error("💥 Error getting channel info", bot_id=bot_id, error=str(e))
             return None
 
     async def save_rewrite_result(self, bot_id: str, rewrite_data: Dict[str, Any]) -> bool:
-        """✅ ИСПРАВЛЕНО: Сохранение результата рерайта с гарантированными медиа ключами"""
+        """Сохранение результата рерайта (медиа хранится только под ключом media_info)"""
         try:
-            # ✅ ИСПРАВЛЕНИЕ: Убеждаемся что оба ключа медиа присутствуют перед сохранением
-            if isinstance(rewrite_data, dict):
-                # Если есть media_info, но нет media - дублируем
-                if 'media_info' in rewrite_data and 'media' not in rewrite_data:
-                    rewrite_data['media'] = rewrite_data['media_info']
-                    logger.debug("📎 Added 'media' key before saving", 
-                                bot_id=bot_id,
-                                has_media_info=bool(rewrite_data['media_info']))
-                
-                # Если есть media, но нет media_info - дублируем
-                elif 'media' in rewrite_data and 'media_info' not in rewrite_data:
-                    rewrite_data['media_info'] = rewrite_data['media']
-                    logger.debug("📎 Added 'media_info' key before saving", 
-                                bot_id=bot_id,
-                                has_media=bool(rewrite_data['media']))
+            # Канонический ключ - media_info, алиас media восстанавливается в get_last_rewrite.
+            # Словарь копируется, чтобы не менять данные вызывающего кода
+            if isinstance(rewrite_data, dict) and 'media' in rewrite_data:
+                rewrite_data = dict(rewrite_data)
+                media = rewrite_data.pop('media')
+                if rewrite_data.get('media_info') is None:
+                    rewrite_data['media_info'] = media
             
             async with get_db_session() as session:
-                query = text("""
-                UPDATE bot_admin_channels 
-                SET last_rerait = :rewrite_data
-                WHERE bot_id = :bot_id AND is_active = true
-                """)
-                
-                result = await session.execute(query, {
+                result = await session.execute(_SAVE_REWRITE_RESULT, {
                     'bot_id': bot_id,
-                    'rewrite_data': json.dumps(rewrite_data)
+                    'rewrite_data': orjson.dumps(rewrite_data).decode()
                 })
                 await session.commit()
                 
                 success = result.rowcount > 0
                 
-                logger.debug("✅ Rewrite result saved with guaranteed media keys", 
-                            bot_id=bot_id,
-                            success=success,
-                            channels_updated=result.rowcount,
-                            has_media=bool(rewrite_data.get('media')),
-                            has_media_info=bool(rewrite_data.get('media_info')))
+                _channel_info_cache.invalidate(bot_id)
+                _last_rewrite_cache.invalidate(bot_id)
+                
+                if _stdlib_logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("✅ Rewrite result saved", 
+                                bot_id=bot_id,
+                                success=success,
+                                channels_updated=result.rowcount,
+                                has_media_info=bool(rewrite_data.get('media_info')))
                 
                 return success
                 
         except Exception as e:
-            logger.error("💥 Error saving rewrite result with media keys", 
+            # Трейсбек только при DEBUG: форматирование стека дорого при потоке ошибок
+            logger.error("💥 Error saving rewrite result", 
                         bot_id=bot_id, 
                         error=str(e),
-                        exc_info=True)
+                        error_type=type(e).__name__,
+                        exc_info=_stdlib_logger.isEnabledFor(logging.DEBUG))
             return False
 
     async def get_last_rewrite(self, bot_id: str) -> Optional[Dict[str, Any]]:
-        """✅ ИСПРАВЛЕНО: Получение последнего рерайта с гарантированными медиа ключами"""
-        try:
-            async with get_db_session() as session:
-                query = text("""
-                SELECT last_rerait FROM bot_admin_channels 
-                WHERE bot_id = :bot_id AND is_active = true
-                LIMIT 1
-                """)
-                result = await session.execute(query, {'bot_id': bot_id})
-                row = result.fetchone()
+        """Получение последнего рерайта с ключами media и media_info (кэшируется на ~5 секунд)"""
+        async def load():
+            async with get_db_session(readonly=True) as session:
+                result = await session.execute(_GET_LAST_REWRITE, {'bot_id': bot_id})
+                rewrite_data = result.scalar_one_or_none()  # JSONB автоматически deserializуется
                 
-                if row and row[0]:
-                    rewrite_data = row[0]  # JSONB автоматически deserializуется
-                    
-                    # ✅ ИСПРАВЛЕНИЕ: Гарантируем наличие обоих медиа ключей
+                if rewrite_data:
                     if isinstance(rewrite_data, dict):
-                        # Если есть media_info, но нет media - дублируем
-                        if 'media_info' in rewrite_data and 'media' not in rewrite_data:
+                        # Медиа хранится под media_info, media - алиас на тот же объект.
+                        # Старые записи могут содержать только media
+                        if 'media_info' in rewrite_data:
                             rewrite_data['media'] = rewrite_data['media_info']
-                            logger.debug("📎 Added 'media' key from 'media_info'", 
-                                        bot_id=bot_id,
-                                        has_media_info=bool(rewrite_data['media_info']))
-                        
-                        # Если есть media, но нет media_info - дублируем
-                        elif 'media' in rewrite_data and 'media_info' not in rewrite_data:
+                        elif 'media' in rewrite_data:
                             rewrite_data['media_info'] = rewrite_data['media']
-                            logger.debug("📎 Added 'media_info' key from 'media'", 
-                                        bot_id=bot_id,
-                                        has_media=bool(rewrite_data['media']))
                         
-                        # Логирование для отладки
-                        logger.debug("✅ Last rewrite retrieved with guaranteed media keys", 
-                                   bot_id=bot_id,
-                                   has_content=bool(rewrite_data.get('content')),
-                                   has_media=bool(rewrite_data.get('media')),
-                                   has_media_info=bool(rewrite_data.get('media_info')),
-                                   rewrite_keys=list(rewrite_data.keys()))
+                        if _stdlib_logger.isEnabledFor(logging.DEBUG):
+                            logger.debug("✅ Last rewrite retrieved", 
+                                       bot_id=bot_id,
+                                       has_content=bool(rewrite_data.get('content')),
+                                       has_media_info=bool(rewrite_data.get('media_info')),
+                                       keys_count=len(rewrite_data))
                     
                     return rewrite_data
                 
                 logger.debug("⚠️ No last rewrite found", bot_id=bot_id)
                 return None
+        
+        try:
+            return await _last_rewrite_cache.get_or_load(bot_id, load)
                 
         except Exception as e:
-            logger.error("💥 Error getting last rewrite with media keys fix", 
+            logger.error("💥 Error getting last rewrite", 
                         bot_id=bot_id, 
                         error=str(e),
-                        exc_info=True)
+                        error_type=type(e).__name__,
+                        exc_info=_stdlib_logger.isEnabledFor(logging.DEBUG))
+            return None
+    
+    async def get_last_rewrite_slim(
+        self,
+        bot_id: str,
+        keys: Tuple[str, ...] = ('content', 'media_info')
+    ) -> Optional[Dict[str, Any]]:
+        """Только нужные ключи последнего рерайта: остальной JSONB не передается и не парсится"""
+        try:
+            params = {'bot_id': bot_id}
+            for i, key in enumerate(keys):
+                params[f'key_{i}'] = key
+            
+            async with get_db_session(readonly=True) as session:
+                result = await session.execute(_slim_rewrite_statement(len(keys)), params)
+                row = result.fetchone()
+            
+            if row is None:
+                return None
+            
+            rewrite_data = {key: value for key, value in zip(keys, row) if value is not None}
+            if 'media_info' in rewrite_data:
+                rewrite_data['media'] = rewrite_data['media_info']
+            return rewrite_data
+            
+        except Exception as e:
+            logger.error("💥 Error getting slim last rewrite", 
+                        bot_id=bot_id, 
+                        keys=keys,
+                        error=str(e))
             return None
     
     # ===== CONTENT AGENTS CRUD =====
@@ -551,7 +482,7 @@ class ContentManager:
         instructions: str,
         openai_agent_id: str = None
     ) -> Optional[Dict[str, Any]]:
-        """✅ Создание контент-агента с проверкой существующих"""
+        """✅ Создание контент-агента или обновление существующего активного"""
         
         logger.info("💾 Creating content agent in database", 
                    bot_id=bot_id,
@@ -559,79 +490,9 @@ class ContentManager:
                    has_openai_id=bool(openai_agent_id))
         
         try:
-            await self._ensure_tables_exist()
-            
             async with get_db_session() as session:
-                # ✅ ПРОВЕРЯЕМ СУЩЕСТВУЮЩИЙ АГЕНТ
-                check_query = text("""
-                SELECT id, agent_name, instructions, openai_agent_id, 
-                       is_active, created_at, updated_at
-                FROM content_agents 
-                WHERE bot_id = :bot_id AND is_active = true
-                LIMIT 1
-                """)
-                
-                existing_result = await session.execute(check_query, {'bot_id': bot_id})
-                existing_agent = existing_result.fetchone()
-                
-                if existing_agent:
-                    logger.info("🔄 Content agent already exists, updating instead", 
-                               bot_id=bot_id,
-                               existing_name=existing_agent[1],
-                               new_name=agent_name)
-                    
-                    # ОБНОВЛЯЕМ СУЩЕСТВУЮЩИЙ АГЕНТ
-                    update_query = text("""
-                    UPDATE content_agents 
-                    SET agent_name = :agent_name,
-                        instructions = :instructions,
-                        openai_agent_id = :openai_agent_id,
-                        updated_at = NOW()
-                    WHERE bot_id = :bot_id AND is_active = true
-                    RETURNING id, bot_id, agent_name, instructions, openai_agent_id, 
-                             is_active, created_at, updated_at
-                    """)
-                    
-                    result = await session.execute(update_query, {
-                        'bot_id': bot_id,
-                        'agent_name': agent_name,
-                        'instructions': instructions,
-                        'openai_agent_id': openai_agent_id
-                    })
-                    
-                    await session.commit()
-                    row = result.fetchone()
-                    
-                    if row:
-                        agent_data = {
-                            'id': row[0],
-                            'bot_id': row[1],
-                            'agent_name': row[2],
-                            'instructions': row[3],
-                            'openai_agent_id': row[4],
-                            'is_active': row[5],
-                            'created_at': row[6],
-                            'updated_at': row[7],
-                            'action': 'updated'  # ✅ ПОКАЗЫВАЕМ ЧТО ОБНОВИЛИ
-                        }
-                        
-                        logger.info("✅ Content agent updated successfully", 
-                                   agent_id=agent_data['id'],
-                                   bot_id=bot_id,
-                                   agent_name=agent_name)
-                        return agent_data
-                
-                # СОЗДАЕМ НОВЫЙ АГЕНТ ТОЛЬКО ЕСЛИ НЕТ СУЩЕСТВУЮЩЕГО
-                create_query = text("""
-                INSERT INTO content_agents (
-                    bot_id, agent_name, instructions, openai_agent_id, 
-                    is_active, created_at, updated_at
-                ) VALUES (:bot_id, :agent_name, :instructions, :openai_agent_id, true, NOW(), NOW())
-                RETURNING id, bot_id, agent_name, instructions, openai_agent_id, 
-                         is_active, created_at, updated_at
-                """)
-                
-                result = await session.execute(create_query, {
+                # Один upsert вместо SELECT + UPDATE/INSERT: активный агент на бота уникален
+                result = await session.execute(_UPSERT_CONTENT_AGENT, {
                     'bot_id': bot_id,
                     'agent_name': agent_name,
                     'instructions': instructions,
@@ -639,6 +500,7 @@ class ContentManager:
                 })
                 
                 await session.commit()
+                _content_agent_cache.invalidate(bot_id)
                 row = result.fetchone()
                 
                 if row:
@@ -651,13 +513,14 @@ class ContentManager:
                         'is_active': row[5],
                         'created_at': row[6],
                         'updated_at': row[7],
-                        'action': 'created'  # ✅ ПОКАЗЫВАЕМ ЧТО СОЗДАЛИ
+                        'action': 'created' if row[8] else 'updated'
                     }
                     
-                    logger.info("✅ Content agent created successfully", 
+                    logger.info("✅ Content agent saved successfully", 
                                agent_id=agent_data['id'],
                                bot_id=bot_id,
-                               agent_name=agent_name)
+                               agent_name=agent_name,
+                               action=agent_data['action'])
                     return agent_data
                 else:
                     logger.error("❌ Failed to create content agent in database")
@@ -670,36 +533,21 @@ class ContentManager:
                         exc_info=True)
             return None
     
+    async def _load_content_agent(self, bot_id: str) -> Optional[Dict[str, Any]]:
+        """Активный контент-агент из БД (загрузчик для _content_agent_cache)"""
+        async with get_db_session(readonly=True) as session:
+            result = await session.execute(_GET_CONTENT_AGENT, {'bot_id': bot_id})
+            row = result.mappings().first()
+            return dict(row) if row else None
+    
     async def get_content_agent(self, bot_id: str) -> Optional[Dict[str, Any]]:
-        """Получение контент-агента по bot_id"""
+        """Получение контент-агента по bot_id (кэшируется на ~60 секунд)"""
         try:
-            await self._ensure_tables_exist()
-            
-            async with get_db_session() as session:
-                query = text("""
-                SELECT id, bot_id, agent_name, instructions, openai_agent_id, 
-                       is_active, created_at, updated_at
-                FROM content_agents 
-                WHERE bot_id = :bot_id AND is_active = true
-                ORDER BY created_at DESC
-                LIMIT 1
-                """)
-                
-                result = await session.execute(query, {'bot_id': bot_id})
-                row = result.fetchone()
-                
-                if row:
-                    return {
-                        'id': row[0],
-                        'bot_id': row[1],
-                        'agent_name': row[2],
-                        'instructions': row[3],
-                        'openai_agent_id': row[4],
-                        'is_active': row[5],
-                        'created_at': row[6],
-                        'updated_at': row[7]
-                    }
-                return None
+            agent = await _content_agent_cache.get_or_load(
+                bot_id, lambda: self._load_content_agent(bot_id)
+            )
+            # Копия, чтобы вызывающий код не менял закэшированный словарь
+            return dict(agent) if agent else None
                 
         except Exception as e:
             logger.error("💥 Error fetching content agent", bot_id=bot_id, error=str(e))
@@ -713,8 +561,6 @@ class ContentManager:
     ) -> bool:
         """Обновление контент-агента"""
         try:
-            await self._ensure_tables_exist()
-            
             async with get_db_session() as session:
                 updates = []
                 params = {'bot_id': bot_id}
@@ -740,6 +586,7 @@ class ContentManager:
                 
                 result = await session.execute(query, params)
                 await session.commit()
+                _content_agent_cache.invalidate(bot_id)
                 
                 rows_affected = result.rowcount
                 
@@ -753,8 +600,6 @@ class ContentManager:
     async def delete_content_agent(self, bot_id: str, soft_delete: bool = False) -> bool:
         """🗑️ ОБНОВЛЕНО: Удаление контент-агента с hard delete по умолчанию"""
         try:
-            await self._ensure_tables_exist()
-            
             async with get_db_session() as session:
                 if soft_delete:
                     # Опциональный soft delete (для совместимости)
@@ -771,6 +616,7 @@ class ContentManager:
                 
                 result = await session.execute(query, {'bot_id': bot_id})
                 await session.commit()
+                _content_agent_cache.invalidate(bot_id)
                 
                 rows_affected = result.rowcount
                 
@@ -789,20 +635,11 @@ class ContentManager:
             return False
     
     async def has_content_agent(self, bot_id: str) -> bool:
-        """Проверка наличия активного контент-агента"""
+        """Проверка наличия активного контент-агента (через кэш get_content_agent)"""
         try:
-            await self._ensure_tables_exist()
-            
-            async with get_db_session() as session:
-                query = text("""
-                SELECT EXISTS(
-                    SELECT 1 FROM content_agents 
-                    WHERE bot_id = :bot_id AND is_active = true
-                )
-                """)
-                
-                result = await session.execute(query, {'bot_id': bot_id})
-                return bool(result.scalar())
+            return await _content_agent_cache.get_or_load(
+                bot_id, lambda: self._load_content_agent(bot_id)
+            ) is not None
                 
         except Exception as e:
             logger.error("💥 Error checking content agent existence", bot_id=bot_id, error=str(e))
@@ -914,9 +751,9 @@ class ContentManager:
             
             char_count = len(text)
             
-            # Подсчет русских символов
-            russian_chars = sum(1 for char in text if '\u0400' <= char <= '\u04FF')
-            english_chars = sum(1 for char in text if char.isalpha() and not ('\u0400' <= char <= '\u04FF'))
+            # Подсчет русских символов и прочих букв (regex-движок вместо посимвольного цикла)
+            russian_chars = len(_CYRILLIC_RE.findall(text))
+            english_chars = len(_OTHER_LETTER_RE.findall(text))
             other_chars = char_count - russian_chars - english_chars
             
             # Коэффициенты для разных языков
@@ -1052,8 +889,6 @@ class ContentManager:
     async def get_daily_token_usage(self, bot_id: str, user_id: int) -> int:
         """✅ Получение использования токенов за сегодня"""
         try:
-            await self._ensure_tables_exist()
-            
             async with get_db_session() as session:
                 query = text("""
                 SELECT COALESCE(SUM(tokens_used), 0) as daily_usage
@@ -1109,8 +944,6 @@ class ContentManager:
     async def _will_exceed_monthly_limit(self, bot_id: str, estimated_tokens: int, monthly_limit: int) -> bool:
         """✅ Проверка превышения месячного лимита"""
         try:
-            await self._ensure_tables_exist()
-            
             async with get_db_session() as session:
                 query = text("""
                 SELECT COALESCE(SUM(tokens_used), 0) as monthly_usage
@@ -1483,37 +1316,33 @@ class ContentManager:
         """
         ✅ ОБНОВЛЕНО: Сохраняем только детальную статистику для аналитики
         Основные токены теперь сохраняются через TokenManager.save_token_usage()
+        
+        Строка попадает в буфер процесса и записывается пачкой
+        (при STATS_FLUSH_SIZE строк или раз в STATS_FLUSH_INTERVAL секунд)
         """
         try:
-            await self._ensure_tables_exist()
-            
-            async with get_db_session() as session:
-                query = text("""
-                INSERT INTO content_rewrite_stats (
-                    bot_id, user_id, tokens_used, processing_time, 
-                    input_tokens, output_tokens, created_at
-                ) VALUES (:bot_id, :user_id, :tokens_used, :processing_time, 
-                         :input_tokens, :output_tokens, NOW())
-                """)
-                
-                await session.execute(query, {
-                    'bot_id': bot_id,
-                    'user_id': user_id,
-                    'tokens_used': tokens_used,
-                    'processing_time': processing_time,
-                    'input_tokens': input_tokens,
-                    'output_tokens': output_tokens
-                })
-                
-                await session.commit()
-                
-                logger.debug("📊 Content rewrite detailed statistics saved", 
-                            bot_id=bot_id,
-                            tokens_used=tokens_used,
-                            input_tokens=input_tokens,
-                            output_tokens=output_tokens,
-                            processing_time=processing_time,
-                            note="✅ Main tokens saved via TokenManager.save_token_usage()")
+            _stats_buffer.append({
+                'bot_id': bot_id,
+                'user_id': user_id,
+                'tokens_used': tokens_used,
+                'processing_time': processing_time,
+                'input_tokens': input_tokens,
+                'output_tokens': output_tokens,
+                'created_at': datetime.now()
+            })
+            _ensure_stats_flusher()
+            
+            if len(_stats_buffer) >= STATS_FLUSH_SIZE:
+                await flush_rewrite_stats()
+            
+            logger.debug("📊 Content rewrite detailed statistics buffered", 
+                        bot_id=bot_id,
+                        tokens_used=tokens_used,
+                        input_tokens=input_tokens,
+                        output_tokens=output_tokens,
+                        processing_time=processing_time,
+                        buffered=len(_stats_buffer),
+                        note="✅ Main tokens saved via TokenManager.save_token_usage()")
                 
         except Exception as e:
             logger.warning("⚠️ Failed to save content rewrite detailed statistics (non-critical)", 
@@ -1529,8 +1358,6 @@ class ContentManager:
             if not agent:
                 return {}
             
-            await self._ensure_tables_exist()
-            
             async with get_db_session() as session:
                 # Детальная статистика токенов
                 stats_query = text("""
@@ -1599,8 +1426,6 @@ class ContentManager:
     async def get_all_content_agents_summary(self) -> Dict[str, Any]:
         """✅ Сводная статистика всех агентов с токенами"""
         try:
-            await self._ensure_tables_exist()
-            
             async with get_db_session() as session:
                 summary_query = text("""
                 SELECT 
@@ -1700,15 +1525,123 @@ class ContentManager:
             }
 
 
-# ===== АВТОМАТИЧЕСКАЯ ИНИЦИАЛИЗАЦИЯ ТАБЛИЦ =====
+# ===== БУФЕР СТАТИСТИКИ РЕРАЙТОВ =====
+
+# Общий для всех экземпляров ContentManager в процессе
+STATS_FLUSH_SIZE = 512
+STATS_FLUSH_INTERVAL = 2.0
+
+_stats_buffer: List[Dict[str, Any]] = []
+_stats_lock = asyncio.Lock()
+_stats_flusher: Optional[asyncio.Task] = None
+
+# С этого размера пачка пишется через COPY, а не executemany
+STATS_COPY_THRESHOLD = 256
+
+_REWRITE_STATS_COLUMNS = (
+    'bot_id', 'user_id', 'tokens_used', 'processing_time',
+    'input_tokens', 'output_tokens', 'created_at'
+)
+
+_INSERT_REWRITE_STATS = text("""
+INSERT INTO content_rewrite_stats (
+    bot_id, user_id, tokens_used, processing_time, 
+    input_tokens, output_tokens, created_at
+) VALUES (:bot_id, :user_id, :tokens_used, :processing_time, 
+         :input_tokens, :output_tokens, :created_at)
+""")
+
+
+async def flush_rewrite_stats() -> int:
+    """Записать накопленную статистику рерайтов одной пачкой"""
+    async with _stats_lock:
+        if not _stats_buffer:
+            return 0
+        
+        batch = _stats_buffer[:]
+        _stats_buffer.clear()
+        
+        try:
+            async with get_db_session() as session:
+                if len(batch) < STATS_COPY_THRESHOLD:
+                    # executemany: один подготовленный INSERT на всю пачку
+                    await session.execute(_INSERT_REWRITE_STATS, batch)
+                else:
+                    # Большие пачки - бинарным COPY через соединение asyncpg
+                    connection = await session.connection()
+                    raw_connection = await connection.get_raw_connection()
+                    await raw_connection.driver_connection.copy_records_to_table(
+                        'content_rewrite_stats',
+                        records=[
+                            tuple(row[column] for column in _REWRITE_STATS_COLUMNS)
+                            for row in batch
+                        ],
+                        columns=_REWRITE_STATS_COLUMNS
+                    )
+        except Exception as e:
+            logger.warning("⚠️ Failed to flush content rewrite statistics (non-critical)", 
+                          rows=len(batch),
+                          error=str(e))
+            return 0
+    
+    logger.debug("📊 Content rewrite statistics flushed", rows=len(batch))
+    return len(batch)
+
+
+async def _stats_flush_loop():
+    """Фоновый сброс буфера раз в STATS_FLUSH_INTERVAL секунд"""
+    while True:
+        await asyncio.sleep(STATS_FLUSH_INTERVAL)
+        await flush_rewrite_stats()
+
+
+def _ensure_stats_flusher():
+    """Запуск фонового сброса при первой записи в буфер"""
+    global _stats_flusher
+    
+    if _stats_flusher is None or _stats_flusher.done():
+        _stats_flusher = asyncio.get_running_loop().create_task(_stats_flush_loop())
+
+
+async def close_rewrite_stats():
+    """Остановить фоновый сброс и записать остаток буфера (при завершении)"""
+    global _stats_flusher
+    
+    if _stats_flusher is not None:
+        _stats_flusher.cancel()
+        try:
+            await _stats_flusher
+        except asyncio.CancelledError:
+            pass
+        _stats_flusher = None
+    
+    return await flush_rewrite_stats()
+
+
+# ===== ПРОВЕРКА СХЕМЫ ПРИ СТАРТЕ =====
+
+# Таблицы создаются моделями (create_all) и Alembic миграциями, не менеджером
+_CONTENT_TABLES = ('content_agents', 'content_rewrite_stats', 'bot_admin_channels')
+
+_MISSING_CONTENT_TABLES = text("""
+SELECT name FROM unnest(CAST(:tables AS text[])) AS name
+WHERE to_regclass(name) IS NULL
+""")
+
 
 async def init_content_tables():
-    """✅ Публичная функция для инициализации таблиц"""
+    """Проверка при старте, что таблицы контент-агентов существуют"""
     try:
-        manager = ContentManager()
-        await manager._ensure_tables_exist()
-        logger.info("✅ Content tables initialized successfully")
+        async with get_db_session(readonly=True) as session:
+            result = await session.execute(_MISSING_CONTENT_TABLES, {'tables': list(_CONTENT_TABLES)})
+            missing = result.scalars().all()
+        
+        if missing:
+            logger.error("💥 Content tables are missing, run `alembic upgrade head`", missing=missing)
+            return False
+        
+        logger.info("✅ Content tables present")
         return True
     except Exception as e:
-        logger.error("💥 Failed to initialize content tables", error=str(e))
+        logger.error("💥 Failed to check content tables", error=str(e))
         return False
@@ -1,8 +1,8 @@
-from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Boolean, Text, ForeignKey, UniqueConstraint, Numeric, Date
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Boolean, Text, ForeignKey, UniqueConstraint, Index, Numeric, Date, Float
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.dialects.postgresql import JSONB, ENUM
 from datetime import datetime, timedelta
 from typing import Optional, List
 import string
@@ -369,6 +369,40 @@ class UserBot(Base):
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     last_activity = Column(DateTime, nullable=True)
     
+    # Indexes
+    __table_args__ = (
+        Index('ix_userbot_created_at_desc', created_at.desc()),  # get_recent_bots
+        Index(
+            'ix_userbot_ai_partial',
+            ai_assistant_type, last_activity.desc(),
+            postgresql_where=(ai_assistant_enabled == True)
+        ),  # get_bots_with_ai
+        Index(
+            'ix_userbot_last_activity_not_inactive', last_activity,
+            postgresql_where=(status != 'inactive')
+        ),  # cleanup_inactive_bots
+        Index('ix_userbot_user_last', user_id, last_activity.desc()),  # search_bots by owner
+        # get_bots_summary status / AI type groups
+        Index('ix_userbot_status', status),
+        Index(
+            'ix_userbot_ai_type_enabled', ai_assistant_type,
+            postgresql_where=(ai_assistant_enabled == True)
+        ),
+        # search_bots: ILIKE '%q%' (requires pg_trgm extension)
+        Index(
+            'ix_userbot_name_trgm', bot_name,
+            postgresql_using='gin', postgresql_ops={'bot_name': 'gin_trgm_ops'}
+        ),
+        Index(
+            'ix_userbot_username_trgm', bot_username,
+            postgresql_using='gin', postgresql_ops={'bot_username': 'gin_trgm_ops'}
+        ),
+        Index(
+            'ix_userbot_openai_agent_id', openai_agent_id,
+            postgresql_where=(openai_agent_id.isnot(None))
+        ),  # lookups by OpenAI agent id
+    )
+    
     # Relationships
     owner = relationship("User", back_populates="bots")
     broadcasts = relationship("Broadcast", back_populates="bot", cascade="all, delete-orphan")
@@ -1253,6 +1287,21 @@ class BotAdminChannel(Base):
     can_post_messages = Column(Boolean, default=True)
     last_rerait = Column(JSONB, nullable=True)  # Последний результат рерайта
     
+    __table_args__ = (
+        # One active channel per bot, any number of inactive ones;
+        # ON CONFLICT target for ContentManager.save_channel_info upsert
+        Index(
+            'uq_bot_channel_active', bot_id,
+            unique=True,
+            postgresql_where=(is_active == True)
+        ),
+        Index(
+            'idx_channels_bot_active', bot_id,
+            postgresql_include=['chat_id'],
+            postgresql_where=(is_active == True)
+        ),  # active channel lookups by bot
+    )
+    
     # Relationships
     bot = relationship("UserBot", back_populates="admin_channels")
     
@@ -1274,6 +1323,20 @@ class ContentAgent(Base):
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     
+    __table_args__ = (
+        # One active agent per bot, any number of soft-deleted ones;
+        # ON CONFLICT target for ContentManager.create_content_agent upsert
+        Index(
+            'uq_content_agent_active', bot_id,
+            unique=True,
+            postgresql_where=(is_active == True)
+        ),
+        Index(
+            'idx_content_agents_bot_active', bot_id,
+            postgresql_where=(is_active == True)
+        ),  # active agent lookups by bot
+    )
+    
     # Relationships
     bot = relationship("UserBot", back_populates="content_agents")
     
@@ -1281,6 +1344,29 @@ class ContentAgent(Base):
         return f"<ContentAgent(id={self.id}, bot_id={self.bot_id}, agent_name={self.agent_name}, is_active={self.is_active})>"
 
 
+class ContentRewriteStats(Base):
+    """Статистика рерайтов контент-агентов (пишется пачками из ContentManager)"""
+    __tablename__ = "content_rewrite_stats"
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    bot_id = Column(String(255), nullable=False)
+    user_id = Column(BigInteger, nullable=True)
+    tokens_used = Column(Integer, default=0, server_default='0', nullable=False)
+    input_tokens = Column(Integer, default=0, server_default='0')
+    output_tokens = Column(Integer, default=0, server_default='0')
+    processing_time = Column(Float, default=0, server_default='0', nullable=False)
+    created_at = Column(DateTime, default=func.now(), server_default=func.now())
+    
+    # Same names as the indexes ContentManager used to create at runtime
+    __table_args__ = (
+        Index('idx_content_stats_bot_id', bot_id),
+        Index('idx_content_stats_created', created_at),
+    )
+    
+    def __repr__(self):
+        return f"<ContentRewriteStats(id={self.id}, bot_id={self.bot_id}, tokens_used={self.tokens_used})>"
+
+
 class Broadcast(Base):
     __tablename__ = "broadcasts"
     
@@ -1449,6 +1535,10 @@ class BroadcastMessage(Base):
     # Unique constraint
     __table_args__ = (
         UniqueConstraint('sequence_id', 'message_number', name='uq_sequence_message_number'),
+        Index(
+            'ix_bm_seq_active', sequence_id,
+            postgresql_where=(is_active == True)
+        ),  # schedule_broadcast_messages_for_subscriber
     )
     
     # Relationships
@@ -1496,10 +1586,36 @@ class ScheduledMessage(Base):
     subscriber_id = Column(BigInteger, nullable=False)  # telegram user_id
     message_id = Column(Integer, ForeignKey("broadcast_messages.id", ondelete="CASCADE"), nullable=False)
     scheduled_at = Column(DateTime, nullable=False)
-    status = Column(String(50), default='pending', nullable=False)  # 'pending', 'sent', 'failed', 'cancelled'
+    status = Column(
+        ENUM('pending', 'processing', 'sent', 'failed', 'cancelled', name='scheduled_message_status'),
+        default='pending', nullable=False
+    )
     sent_at = Column(DateTime, nullable=True)
     error_message = Column(Text, nullable=True)
     created_at = Column(DateTime, default=func.now(), nullable=False)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), nullable=False)
+    
+    # Indexes
+    __table_args__ = (
+        Index(
+            'ix_sched_pending_at', scheduled_at,
+            postgresql_where=(status == 'pending')
+        ),  # get_pending_scheduled_messages
+        Index(
+            'ix_sched_processing_updated', updated_at,
+            postgresql_where=(status == 'processing')
+        ),  # expiry of stale sender claims
+        Index('ix_sched_bot_status', bot_id, status),  # per-bot stats / cancel
+        Index(
+            'ix_sm_cleanup_cov', status, updated_at,
+            postgresql_include=['id'],
+            postgresql_where=status.in_(['sent', 'failed', 'cancelled'])
+        ),  # cleanup_old_scheduled_messages (index-only id lookup)
+        Index(
+            'ix_scheduled_messages_created_at_brin', created_at,
+            postgresql_using='brin', postgresql_with={'pages_per_range': 32}
+        ),  # refresh_broadcast_stats_daily range scan (append-mostly table)
+    )
     
     # Relationships
     bot = relationship("UserBot", back_populates="scheduled_messages")
@@ -1509,6 +1625,19 @@ class ScheduledMessage(Base):
         return f"<ScheduledMessage(id={self.id}, bot_id={self.bot_id}, subscriber_id={self.subscriber_id}, status={self.status})>"
 
 
+class BroadcastStatsDaily(Base):
+    """Дневной rollup scheduled_messages по статусам (для get_broadcast_summary)"""
+    __tablename__ = "broadcast_stats_daily"
+    
+    day = Column(Date, primary_key=True)                    # scheduled_messages.created_at::date
+    status = Column(String(50), primary_key=True)
+    count = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), nullable=False)
+    
+    def __repr__(self):
+        return f"<BroadcastStatsDaily(day={self.day}, status={self.status}, count={self.count})>"
+
+
 # ✅ Admin activity logging table
 class BotAdminLog(Base):
     """Лог действий администраторов ботов"""
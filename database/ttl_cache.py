@@ -0,0 +1,87 @@
+"""
+Process-local TTL cache for read-mostly database results.
+
+Managers use it to serve dashboard aggregates and hot lookups without
+querying PostgreSQL on every call. Entries live only in the current
+process, so each worker keeps its own copy and writers invalidate locally.
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+_MISSING = object()
+
+
+class AsyncTTLCache:
+    """TTL cache with single-flight loading per key"""
+
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: Dict[Hashable, Tuple[float, Any]] = {}
+        self._locks: Dict[Hashable, asyncio.Lock] = {}
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return cached value or default if missing/expired"""
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+
+        expires_at, value = entry
+        if time.monotonic() >= expires_at:
+            self._data.pop(key, None)
+            return default
+
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store value for ttl seconds (defaults to the cache ttl)"""
+        if key not in self._data and len(self._data) >= self.maxsize:
+            self._evict()
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+
+    def invalidate(self, key: Hashable = _MISSING):
+        """Drop one key, or the whole cache when no key is given"""
+        if key is _MISSING:
+            self._data.clear()
+        else:
+            self._data.pop(key, None)
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        cache_none: bool = True
+    ) -> Any:
+        """Return cached value, loading it once for concurrent callers on a miss
+
+        With cache_none=False a None result is returned but not stored, so
+        the next call loads again.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+
+            try:
+                value = await loader()
+                if value is not None or cache_none:
+                    self.set(key, value)
+                return value
+            finally:
+                self._locks.pop(key, None)
+
+    def _evict(self):
+        """Drop expired entries, then the oldest one if still full"""
+        now = time.monotonic()
+        for key in [k for k, (expires_at, _) in self._data.items() if expires_at <= now]:
+            del self._data[key]
+
+        if len(self._data) >= self.maxsize:
+            del self._data[next(iter(self._data))]
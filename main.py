@@ -524,6 +524,10 @@ class BotFactory:
             await init_database()
             logger.info("✅ Database initialized successfully")
             
+            # Content schema comes from models and Alembic; report missing migrations early
+            from database.managers.content_manager import init_content_tables
+            await init_content_tables()
+            
             # Initialize bot manager
             logger.info("🤖 Creating Bot Manager...")
             self.bot_manager = BotManager()
@@ -704,6 +708,13 @@ class BotFactory:
                 except Exception as e:
                     logger.warning("⚠️ Error stopping web server", error=str(e))
             
+            # Flush buffered content rewrite statistics
+            try:
+                from database.managers.content_manager import close_rewrite_stats
+                await close_rewrite_stats()
+            except Exception as e:
+                logger.warning("⚠️ Error flushing content rewrite stats", error=str(e))
+            
             # Close database connections
             try:
                 await close_database()
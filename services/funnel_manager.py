@@ -92,7 +92,7 @@ class FunnelManager:
             )
             
             # Schedule all funnel messages
-            scheduled_messages = await db.schedule_broadcast_messages_for_subscriber(
+            scheduled_count = await db.schedule_broadcast_messages_for_subscriber(
                 bot_id=bot_id,
                 subscriber_id=user_id,
                 sequence_id=funnel_config['sequence_id']
@@ -106,7 +106,7 @@ class FunnelManager:
                 additional_data={
                     'username': username,
                     'first_name': first_name,
-                    'messages_scheduled': len(scheduled_messages)
+                    'messages_scheduled': scheduled_count
                 }
             )
             
@@ -115,7 +115,7 @@ class FunnelManager:
                        user_id=user_id,
                        username=username,
                        first_name=first_name,
-                       messages_scheduled=len(scheduled_messages))
+                       messages_scheduled=scheduled_count)
             
             return True
             
@@ -173,26 +173,32 @@ class FunnelManager:
                        actual_number=available_number,
                        existing_count=len(existing_numbers))
             
-            # ✅ UPDATED: Передаем новые параметры без media_url
-            message = await db.create_broadcast_message(
-                sequence_id=sequence_id,
-                message_number=available_number,
-                message_text=message_text,
-                delay_hours=delay_hours,
-                media_url=None,  # УДАЛЕНО или поставлено None
-                media_type=media_type,
-                media_file_id=media_file_id,
-                media_file_unique_id=media_file_unique_id,
-                media_file_size=media_file_size,
-                media_filename=media_filename
-            )
+            from database import get_db_session
             
-            # Update UTM fields
-            await db.update_broadcast_message(
-                message_id=message.id,
-                utm_campaign=utm_campaign,
-                utm_content=utm_content
-            )
+            # Создание сообщения и UTM-поля — одна транзакция
+            async with get_db_session() as session:
+                # ✅ UPDATED: Передаем новые параметры без media_url
+                message = await db.create_broadcast_message(
+                    sequence_id=sequence_id,
+                    message_number=available_number,
+                    message_text=message_text,
+                    delay_hours=delay_hours,
+                    media_url=None,  # УДАЛЕНО или поставлено None
+                    media_type=media_type,
+                    media_file_id=media_file_id,
+                    media_file_unique_id=media_file_unique_id,
+                    media_file_size=media_file_size,
+                    media_filename=media_filename,
+                    session=session
+                )
+                
+                # Update UTM fields
+                await db.update_broadcast_message(
+                    message_id=message.id,
+                    utm_campaign=utm_campaign,
+                    utm_content=utm_content,
+                    session=session
+                )
             
             # Refresh cache
             await self.refresh_funnel_cache(bot_id)
@@ -257,6 +263,7 @@ class FunnelManager:
                 return False
             
             # ✅ ОБНОВЛЕНО: передаем все новые параметры без media_url
+            # (смена delay_hours пересчитывает pending scheduled_messages в той же транзакции)
             await db.update_broadcast_message(
                 message_id=message_id,
                 message_text=message_text,
@@ -269,11 +276,6 @@ class FunnelManager:
                 media_filename=media_filename
             )
             
-            # ✅ НОВОЕ: Если меняется delay_hours, обновляем pending scheduled_messages
-            if delay_hours is not None:
-                await db.reschedule_pending_messages(message_id, float(delay_hours))
-                logger.info("Rescheduled pending messages", message_id=message_id, new_delay=delay_hours)
-            
             # Refresh cache
             await self.refresh_funnel_cache(bot_id)
             
@@ -752,7 +754,7 @@ class FunnelManager:
             async with get_db_session() as session:
                 result = await session.execute(text("""
                     UPDATE scheduled_messages 
-                    SET status = 'cancelled'
+                    SET status = 'cancelled', updated_at = NOW()
                     WHERE message_id = :message_id AND status = 'pending'
                 """), {'message_id': message_id})
                 
@@ -13,6 +13,10 @@ from database import db
 
 logger = logging.getLogger(__name__)
 
+# Statuses are written every this many messages, so a crash or failed
+# flush leaves at most one batch of sent messages unconfirmed
+_STATUS_FLUSH_BATCH_SIZE = 10
+
 
 @dataclass
 class MessageDetails:
@@ -72,6 +76,11 @@ class MessageScheduler:
             'errors': [],
             'last_run': None
         }
+        # Status updates collected during a tick, flushed in small batches
+        self._sent_ids: List[int] = []
+        self._failed_items: List[tuple] = []
+        # Дневной rollup статистики рассылок пересчитывается раз в час
+        self._stats_refreshed_at: Optional[datetime] = None
     
     async def start(self):
         """Start message scheduler with background task"""
@@ -106,6 +115,8 @@ class MessageScheduler:
                 else:
                     logger.debug("📭 No messages to process")
                 
+                await self._refresh_broadcast_stats()
+                
                 # Ждем 30 секунд до следующей проверки
                 await asyncio.sleep(30)
                 
@@ -117,6 +128,18 @@ class MessageScheduler:
                 # При ошибке ждем минуту перед повторной попыткой
                 await asyncio.sleep(60)
 
+    async def _refresh_broadcast_stats(self) -> None:
+        """Пересчет broadcast_stats_daily не чаще раза в час"""
+        now = datetime.now()
+        if self._stats_refreshed_at and now - self._stats_refreshed_at < timedelta(hours=1):
+            return
+        
+        try:
+            await db.refresh_broadcast_stats_daily()
+            self._stats_refreshed_at = now
+        except Exception as e:
+            logger.error(f"❌ ERROR REFRESHING BROADCAST STATS: {e}")
+    
     def get_scheduler_stats(self) -> Dict[str, Any]:
         """Get scheduler statistics"""
         return {
@@ -140,17 +163,10 @@ class MessageScheduler:
         }
         
         try:
-            # ✅ ИСПРАВЛЕНО: Получаем реальные сообщения из БД
-            scheduled_messages = await self._get_pending_messages()
-            
-            if not scheduled_messages:
-                logger.debug("📭 NO SCHEDULED MESSAGES TO SEND")
-                return current_stats
-            
-            logger.info(f"📬 FOUND SCHEDULED MESSAGES: {len(scheduled_messages)}")
-            
-            # Обрабатываем каждое сообщение
-            for scheduled_msg in scheduled_messages:
+            # Строки захватываются коротким UPDATE ... RETURNING (статус 'processing'),
+            # отправка идет уже вне транзакции и без блокировок
+            claimed = await db.claim_pending_scheduled_messages(limit=100)
+            for scheduled_msg in claimed:
                 try:
                     await self._process_single_message(scheduled_msg, current_stats)
                     # Небольшая задержка между отправками для соблюдения лимитов Telegram
@@ -159,11 +175,18 @@ class MessageScheduler:
                     logger.error(f"❌ ERROR PROCESSING SINGLE MESSAGE {scheduled_msg.id}: {e}")
                     current_stats['messages_sent_failed'] += 1
                     current_stats['errors'].append(f"Message {scheduled_msg.id}: {str(e)}")
+            
+            if not current_stats['messages_processed']:
+                logger.debug("📭 NO SCHEDULED MESSAGES TO SEND")
+            else:
+                logger.info(f"📬 PROCESSED SCHEDULED MESSAGES: {current_stats['messages_processed']}")
                 
         except Exception as e:
             logger.error(f"❌ ERROR IN SCHEDULED MESSAGES PROCESSING: {e}")
             current_stats['errors'].append(f"Processing error: {str(e)}")
         
+        await self._flush_status_updates()
+        
         # Обновляем общую статистику
         self.stats['messages_processed'] += current_stats['messages_processed']
         self.stats['messages_sent_success'] += current_stats['messages_sent_success']
@@ -179,19 +202,6 @@ class MessageScheduler:
         logger.debug("✅ SCHEDULED MESSAGES PROCESSING COMPLETED")
         return current_stats
     
-    async def _get_pending_messages(self) -> List:
-        """✅ ИСПРАВЛЕНО: Получение сообщений готовых к отправке из БД"""
-        try:
-            # Получаем pending сообщения из базы данных
-            pending_messages = await db.get_pending_scheduled_messages(limit=100)
-            
-            logger.debug(f"📥 Retrieved {len(pending_messages)} pending messages from DB")
-            return pending_messages
-            
-        except Exception as e:
-            logger.error(f"❌ ERROR GETTING PENDING MESSAGES: {e}")
-            return []
-    
     async def _process_single_message(self, scheduled_msg, current_stats: dict) -> None:
         """Обработка одного запланированного сообщения"""
         try:
@@ -466,29 +476,35 @@ class MessageScheduler:
             raise
     
     async def _mark_message_sent(self, scheduled_msg) -> None:
-        """✅ ИСПРАВЛЕНО: Отметка сообщения как отправленного"""
-        try:
-            await db.update_scheduled_message_status(
-                message_id=scheduled_msg.id,
-                status='sent'
-            )
-            logger.debug(f"Message {scheduled_msg.id} marked as sent")
-            
-        except Exception as e:
-            logger.error(f"❌ ERROR MARKING MESSAGE AS SENT {scheduled_msg.id}: {e}")
+        """Отметка сообщения как отправленного (сохраняется пачками)"""
+        self._sent_ids.append(scheduled_msg.id)
+        logger.debug(f"Message {scheduled_msg.id} queued as sent")
+        
+        if len(self._sent_ids) >= _STATUS_FLUSH_BATCH_SIZE:
+            await self._flush_status_updates()
     
     async def _mark_message_failed(self, scheduled_msg, error: str) -> None:
-        """✅ ИСПРАВЛЕНО: Отметка сообщения как неудачного"""
+        """Отметка сообщения как неудачного (сохраняется пачками)"""
+        self._failed_items.append((scheduled_msg.id, error))
+        logger.debug(f"Message {scheduled_msg.id} queued as failed: {error}")
+        
+        if len(self._failed_items) >= _STATUS_FLUSH_BATCH_SIZE:
+            await self._flush_status_updates()
+    
+    async def _flush_status_updates(self) -> None:
+        """Сохранение накопленных статусов: один UPDATE для sent, один executemany для failed"""
+        sent_ids, self._sent_ids = self._sent_ids, []
+        failed_items, self._failed_items = self._failed_items, []
+        
         try:
-            await db.update_scheduled_message_status(
-                message_id=scheduled_msg.id,
-                status='failed',
-                error_message=error
-            )
-            logger.debug(f"Message {scheduled_msg.id} marked as failed: {error}")
-            
+            await db.bulk_mark_sent(sent_ids)
+        except Exception as e:
+            logger.error(f"❌ ERROR MARKING MESSAGES AS SENT {sent_ids}: {e}")
+        
+        try:
+            await db.bulk_mark_failed(failed_items)
         except Exception as e:
-            logger.error(f"❌ ERROR MARKING MESSAGE AS FAILED {scheduled_msg.id}: {e}")
+            logger.error(f"❌ ERROR MARKING MESSAGES AS FAILED {[mid for mid, _ in failed_items]}: {e}")
     
     async def schedule_message(
         self,
@@ -527,8 +543,7 @@ class MessageScheduler:
     async def get_pending_count(self) -> int:
         """Получить количество ожидающих сообщений"""
         try:
-            pending_messages = await db.get_pending_scheduled_messages(limit=1000)
-            return len(pending_messages)
+            return await db.count_pending_scheduled_messages()
         except Exception as e:
             logger.error(f"Error getting pending count: {e}")
             return 0
@@ -97,9 +97,11 @@ class ChannelHandlersMixin:
         try:
             # Получаем данные канала и последний рерайт
             channel_info = await content_agent_service.content_manager.get_channel_info(self.bot_id)
-            last_rewrite = await content_agent_service.content_manager.get_last_rewrite(self.bot_id)
+            last_rewrite = await content_agent_service.content_manager.get_last_rewrite_slim(
+                self.bot_id, ('content', 'media_info')
+            )
             
-            if not channel_info or not last_rewrite:
+            if not channel_info or not last_rewrite or 'content' not in last_rewrite:
                 await callback.answer("Нет данных для публикации", show_alert=True)
                 return
             
@@ -281,9 +281,11 @@ class RewriteHandlersMixin:
                 return
             
             # Получаем последний рерайт
-            last_rewrite = await content_agent_service.content_manager.get_last_rewrite(self.bot_id)
+            last_rewrite = await content_agent_service.content_manager.get_last_rewrite_slim(
+                self.bot_id, ('content', 'media_info', 'links_info')
+            )
             
-            if not last_rewrite:
+            if not last_rewrite or 'content' not in last_rewrite:
                 await message.answer("❌ Нет данных для редактирования")
                 return
             